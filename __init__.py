@@ -1,37 +1,60 @@
 import os
+import re
 import sys
+import time
 import subprocess
+from importlib import metadata
+
+STARTUP_TIMINGS = []  # 启动各阶段耗时：[(阶段名称, 秒)]
+_phase_start = time.perf_counter()
+
+
+def _record_phase(name):
+    global _phase_start
+    now = time.perf_counter()
+    STARTUP_TIMINGS.append((name, now - _phase_start))
+    _phase_start = now
+
 
 """
-检测requirements.txt中声明的模块是否已安装，未安装则自动安装
+检测requirements.txt中声明的模块是否已安装，只有缺失时才调用 pip 安装。
+在进程内通过 importlib.metadata 检查，不再每次启动都启动 pip 子进程。
 """
 requirements_file = os.path.join(os.path.dirname(__file__), "requirements.txt")
-try:
-    # 检查pip是否已安装
-    subprocess.check_call([sys.executable, "-m", "pip", "--version"])
-except subprocess.CalledProcessError:
-    print(f"[PromptTranslator] pip is not installed. Attempting to install...")
-    try:
-        # 尝试安装pip
-        subprocess.check_call([sys.executable, "-m", "ensurepip", "--default-pip"])
-    except subprocess.CalledProcessError:
-        print(f"[PromptTranslator] Failed to install pip. Please install pip manually and try again.")
-        sys.exit(1)
 
-print(f"[PromptTranslator] Installing modules from {requirements_file}...")
-try:
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", "-r", requirements_file])
-    print(f"[PromptTranslator] All modules have been installed successfully.")
-except subprocess.CalledProcessError as e:
-    print(f"[PromptTranslator] Error installing modules: {e}")
-    sys.exit(1)
-        
+
+def _missing_requirements(path):
+    missing = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            requirement = line.split("#", 1)[0].strip()
+            if not requirement:
+                continue
+            name = re.split(r"[\s<>=!~;\[]", requirement, 1)[0]
+            try:
+                metadata.distribution(name)
+            except metadata.PackageNotFoundError:
+                missing.append(requirement)
+    return missing
 
 
+_missing = _missing_requirements(requirements_file)
+if _missing:
+    print(f"[PromptTranslator] Installing missing modules: {', '.join(_missing)}")
+    try:
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", *_missing])
+        print(f"[PromptTranslator] All modules have been installed successfully.")
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"[PromptTranslator] Error installing modules: {e}")
+_record_phase("requirements")
+
 
 import glob
 import importlib
-from .utils import log, getExtDir
+from .utils import log, getExtDir, startWarmup
+from .metrics import registerMetricsRoute
+from .pretranslate import registerPretranslateRoute
+_record_phase("utils")
 
 """
 自动识别要导出的节点及其名称加到字典属性中，以便在UI中显示
@@ -55,5 +78,20 @@ for file in files:
             NODE_DISPLAY_NAME_MAPPINGS.update(module.NODE_DISPLAY_NAME_MAPPINGS)
     except Exception as e:
         log(f"Error loading node: {e}")
+    _record_phase(f"node {module_name}")
+
+# 注册 /prompt_translator/metrics，输出 Prometheus 格式的指标
+registerMetricsRoute()
+
+# 注册 /prompt_translator/pretranslate，编辑提示词时在后台预翻译（前端见 web/pretranslate.js）
+registerPretranslateRoute()
+WEB_DIRECTORY = "./web"
+_record_phase("routes")
+
+# 后台预热配置的翻译模型，不阻塞启动
+startWarmup()
+_record_phase("warmup scheduled")
+
+print("[PromptTranslator] Startup: " + ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in STARTUP_TIMINGS))
 
-__all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"]
\ No newline at end of file
+__all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS", "WEB_DIRECTORY"]
\ No newline at end of file
@@ -0,0 +1,185 @@
+import os
+import json
+from .metrics import stage, count
+
+# 生成参数配置：
+# - fast：贪心解码，最大生成长度按输入长度缩放，适合短标签
+# - balanced：少量 beam，提前结束
+# - quality：使用模型 config.json 中的默认参数（opus-mt 为 6 beam，最大长度 512），与原来的行为一致
+GENERATION_PROFILES = {
+    'fast': {'num_beams': 1, 'max_new_tokens_scale': 2.0, 'max_new_tokens_offset': 8},
+    'balanced': {'num_beams': 2, 'early_stopping': True, 'max_new_tokens_scale': 3.0, 'max_new_tokens_offset': 10},
+    'quality': {},
+}
+
+# 默认的生成参数配置，也可以通过环境变量 PROMPT_TRANSLATOR_PROFILE 指定
+DEFAULT_PROFILE = os.environ.get('PROMPT_TRANSLATOR_PROFILE') or 'quality'
+
+
+def getProfile(name=None):
+    """返回 (配置名称, 配置参数)，未知名称使用默认配置"""
+    name = name or DEFAULT_PROFILE
+    if name not in GENERATION_PROFILES:
+        name = DEFAULT_PROFILE if DEFAULT_PROFILE in GENERATION_PROFILES else 'quality'
+    return name, GENERATION_PROFILES[name]
+
+
+def maxNewTokens(profile, input_length):
+    """按输入的 token 数计算最大生成长度，配置中没有 max_new_tokens_scale 时返回 None"""
+    if 'max_new_tokens_scale' not in profile:
+        return None
+    return int(input_length * profile['max_new_tokens_scale'] + profile.get('max_new_tokens_offset', 0))
+
+
+def interruptCriteria(interrupted):
+    """generate 的停止条件：interrupted() 返回 True 时停止生成"""
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class InterruptCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return interrupted()
+
+    return StoppingCriteriaList([InterruptCriteria()])
+
+
+class TorchBackend:
+    """默认后端：PyTorch MarianMTModel.generate"""
+
+    name = 'torch'
+
+    def generate(self, texts, from_lang, profile=None):
+        from .utils import load_marian_mt, isInterrupted, throwIfInterrupted
+
+        _, profile = getProfile(profile)
+        model, tokenizer = load_marian_mt(from_lang)
+        with stage('tokenize'):
+            inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        count('tokens_in', int(inputs['attention_mask'].sum()))
+
+        kwargs = {key: value for key, value in profile.items() if not key.startswith('max_new_tokens_')}
+        if 'max_new_tokens_scale' in profile:
+            kwargs['max_new_tokens'] = maxNewTokens(profile, inputs['input_ids'].shape[1])
+        # 每生成一个 token 检查一次 ComfyUI 的取消操作，取消后立即停止生成，不再占用 CPU
+        kwargs['stopping_criteria'] = interruptCriteria(isInterrupted)
+        with stage('generate'):
+            translated = model.generate(**inputs, **kwargs)
+        # 被取消时生成的译文不完整，不能返回
+        throwIfInterrupted()
+        count('tokens_out', int(translated.numel()))
+        with stage('decode'):
+            return tokenizer.batch_decode(translated, skip_special_tokens=True)
+
+
+class CTranslate2Backend:
+    """
+    CTranslate2 后端：首次使用时把 Helsinki-NLP 下的模型转换为 int8 量化的 CTranslate2 模型，
+    转换结果缓存在 cache/ct2 目录，源模型文件变化后自动重新转换。CPU 上通常比 PyTorch 快数倍。
+
+    需要安装 ctranslate2：pip install ctranslate2
+    """
+
+    name = 'ctranslate2'
+    quantization = 'int8'
+
+    def __init__(self, threads=0):
+        self.threads = threads
+
+    @staticmethod
+    def available():
+        try:
+            import ctranslate2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def convert(self, from_lang):
+        """转换模型并返回转换后的目录，已转换且源模型未变化时直接返回"""
+        from .utils import getExtDir, getModelPath, getModelFingerprint, convertModelOnce, log
+
+        model_path = getModelPath(from_lang)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model not found: {model_path}")
+
+        model_name = os.path.basename(model_path)
+        fingerprint = getModelFingerprint(from_lang)
+        output_dir = os.path.join(getExtDir('cache'), 'ct2', f'{model_name}-{self.quantization}-{fingerprint[:16]}')
+
+        def convert(tmp_dir):
+            import ctranslate2
+
+            log(f"Converting {model_path} to CTranslate2 ({self.quantization})")
+            converter = ctranslate2.converters.TransformersConverter(model_path)
+            converter.convert(tmp_dir, quantization=self.quantization, force=True)
+
+        return convertModelOnce(output_dir, fingerprint, convert)
+
+    def load(self, from_lang):
+        from .utils import MARIAN_LOADED, getModelPath, load_marian_tokenizer
+
+        def load():
+            import ctranslate2
+
+            count('model_loads')
+            with stage('model_load'):
+                output_dir = self.convert(from_lang)
+                model_path = getModelPath(from_lang)
+                translator = ctranslate2.Translator(
+                    output_dir, device='cpu', compute_type=self.quantization, intra_threads=self.threads
+                )
+                tokenizer = load_marian_tokenizer(from_lang)
+            with open(os.path.join(model_path, 'config.json'), encoding='utf-8') as f:
+                beam_size = json.load(f).get('num_beams', 4)
+            return (translator, tokenizer, beam_size, directoryBytes(output_dir))
+
+        # 路由到多语言模型的语言共用一个转换后的模型
+        model_name = os.path.basename(getModelPath(from_lang))
+        return MARIAN_LOADED.get(f'{self.name}:{model_name}', load, sizeof=lambda loaded: loaded[3])
+
+    def generate(self, texts, from_lang, profile=None):
+        _, profile = getProfile(profile)
+        translator, tokenizer, beam_size, _ = self.load(from_lang)
+        with stage('tokenize'):
+            sources = [tokenizer.convert_ids_to_tokens(tokenizer.encode(text)) for text in texts]
+        count('tokens_in', sum(len(source) for source in sources))
+
+        kwargs = {'beam_size': profile.get('num_beams', beam_size), 'max_batch_size': 64}
+        if 'max_new_tokens_scale' in profile:
+            kwargs['max_decoding_length'] = maxNewTokens(profile, max(len(source) for source in sources))
+        with stage('generate'):
+            results = translator.translate_batch(sources, **kwargs)
+        count('tokens_out', sum(len(result.hypotheses[0]) for result in results))
+        with stage('decode'):
+            return [
+                tokenizer.decode(tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True)
+                for result in results
+            ]
+
+
+def directoryBytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend(),
+    CTranslate2Backend.name: CTranslate2Backend(),
+}
+
+DEFAULT_BACKEND = TorchBackend.name
+
+
+def getBackend(name=None):
+    """按名称获取推理后端，未知名称或依赖未安装时回退到 PyTorch 后端"""
+    from .utils import log
+
+    backend = BACKENDS.get(name or DEFAULT_BACKEND)
+    if backend is None:
+        log(f"Unknown backend: {name}, fallback to {DEFAULT_BACKEND}")
+        return BACKENDS[DEFAULT_BACKEND]
+    if hasattr(backend, 'available') and not backend.available():
+        log(f"Backend {name} is not installed, fallback to {DEFAULT_BACKEND}")
+        return BACKENDS[DEFAULT_BACKEND]
+    return backend
@@ -0,0 +1,24 @@
+import os
+import sys
+import types
+import importlib
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = 'PromptTranslator'
+
+# 基准测试测量当前进程中的翻译，不把请求交给本机翻译服务
+os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'
+
+
+def loadPlugin(module='utils'):
+    """
+    在 ComfyUI 之外导入插件的子模块。
+
+    插件目录名包含 '-'，不能直接 import，这里注册一个同名的空包，
+    只导入需要的子模块，不执行 __init__.py 中的依赖检查和节点注册。
+    """
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f'{PACKAGE_NAME}.{module}')
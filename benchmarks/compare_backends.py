@@ -0,0 +1,107 @@
+"""
+对比各推理后端的翻译延迟和译文一致性，以 PyTorch 后端的译文为基准。
+
+用法：
+    python benchmarks/compare_backends.py --lang zh
+    python benchmarks/compare_backends.py --lang zh --prompts prompts.txt --output report.json
+"""
+import sys
+import json
+import time
+import argparse
+import difflib
+import statistics
+
+from _plugin import loadPlugin
+
+SAMPLE_PROMPTS = [
+    '杰作',
+    '最高质量',
+    '一个女孩',
+    '长发，蓝色眼睛，微笑',
+    '一个穿着红色连衣裙的女孩站在樱花树下，背景是夕阳',
+    '城市夜景，霓虹灯，下雨，赛博朋克风格',
+]
+
+
+def prepareModel(utils, backend, lang):
+    """完成一次性的模型转换（safetensors 或 CTranslate2），返回耗时（秒），使冷加载时间不包含转换"""
+    start = time.perf_counter()
+    if hasattr(backend, 'convert'):
+        backend.convert(lang)
+    elif utils.LOW_MEMORY_LOADING:
+        utils.getSafetensorsPath(lang)
+    return time.perf_counter() - start
+
+
+def runBackend(utils, backends, name, prompts, lang, repeat, profile=None):
+    backend = backends.BACKENDS[name]
+    convert_seconds = prepareModel(utils, backend, lang)
+    start = time.perf_counter()
+    outputs = backend.generate(prompts[:1], lang, profile)  # 首次调用包含模型加载，不包含转换
+    cold_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = backend.generate(prompts, lang, profile)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'backend': name,
+        'profile': backends.getProfile(profile)[0],
+        'convert_seconds': round(convert_seconds, 4),
+        'cold_seconds': round(cold_seconds, 4),
+        'batch_latency_median': round(statistics.median(latencies), 4),
+        'per_prompt_ms': round(statistics.median(latencies) / len(prompts) * 1000, 2),
+        'outputs': [utils.postprocessTranslation(text) if text else text for text in outputs],
+    }
+
+
+def scoreAgainst(reference, results):
+    """以 reference 的译文和延迟为基准，计算各结果的一致性和加速比"""
+    for result in results:
+        pairs = list(zip(reference['outputs'], result['outputs']))
+        result['exact_match'] = round(sum(a == b for a, b in pairs) / len(pairs), 4)
+        result['similarity'] = round(statistics.mean(difflib.SequenceMatcher(None, a, b).ratio() for a, b in pairs), 4)
+        result['speedup'] = round(reference['batch_latency_median'] / result['batch_latency_median'], 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lang', default='zh')
+    parser.add_argument('--prompts', help='每行一个提示词的文本文件')
+    parser.add_argument('--backends', default=None, help='逗号分隔的后端名称，默认全部可用后端')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='JSON 报告的输出路径，默认输出到标准输出')
+    args = parser.parse_args()
+
+    utils = loadPlugin('utils')
+    backends = loadPlugin('backends')
+
+    prompts = SAMPLE_PROMPTS
+    if args.prompts:
+        with open(args.prompts, encoding='utf-8') as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    names = args.backends.split(',') if args.backends else [
+        name for name, backend in backends.BACKENDS.items()
+        if not hasattr(backend, 'available') or backend.available()
+    ]
+
+    results = [runBackend(utils, backends, name, prompts, args.lang, args.repeat) for name in names]
+    reference = next((r for r in results if r['backend'] == backends.DEFAULT_BACKEND), results[0])
+    scoreAgainst(reference, results)
+
+    report = {'lang': args.lang, 'prompts': prompts, 'results': results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+对比模型的加载方式：加载耗时，以及加载前后的进程常驻内存（RSS）。
+
+- pytorch：直接从 pytorch_model.bin 加载（反序列化整个 pickle）
+- safetensors：转换为 safetensors 后按内存映射加载，low_cpu_mem_usage
+- safetensors-bf16：同上，加载时把权重转换为 bfloat16
+
+每种方式在独立的子进程中加载，互不影响内存统计；safetensors 的一次性转换在测量之前完成。
+默认在临时目录中生成小型随机模型（见 tiny_model.py），指定 --models-dir 时使用真实模型。
+
+用法：
+    python benchmarks/compare_loading.py --lang zh
+    python benchmarks/compare_loading.py --models-dir ../Helsinki-NLP --lang zh
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+from _plugin import loadPlugin
+
+MODES = {
+    'pytorch': {'low_memory': False, 'dtype': 'float32'},
+    'safetensors': {'low_memory': True, 'dtype': 'float32'},
+    'safetensors-bf16': {'low_memory': True, 'dtype': 'bfloat16'},
+}
+
+
+def loadOnce(lang, mode):
+    """在当前进程中按指定方式加载一次模型，返回加载报告"""
+    utils = loadPlugin('utils')
+    utils.LOW_MEMORY_LOADING = MODES[mode]['low_memory']
+    utils.MODEL_DTYPE = MODES[mode]['dtype']
+    utils.load_marian_mt(lang)
+    return utils.MODEL_LOAD_REPORTS[lang]
+
+
+def runMode(lang, mode):
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--lang', lang, '--child', mode], env=dict(os.environ)
+    )
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', help='使用该目录下的真实模型，默认生成小型随机模型')
+    parser.add_argument('--lang', default='zh')
+    parser.add_argument('--child', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(loadOnce(args.lang, args.child)))
+        return 0
+
+    if args.models_dir:
+        os.environ['PROMPT_TRANSLATOR_MODELS_DIR'] = os.path.abspath(args.models_dir)
+    else:
+        from tiny_model import buildTinyModel
+
+        models_dir = tempfile.mkdtemp(prefix='prompt-translator-bench-')
+        buildTinyModel(models_dir, args.lang)
+        os.environ['PROMPT_TRANSLATOR_MODELS_DIR'] = models_dir
+
+    # 先完成一次性的 safetensors 转换
+    loadPlugin('utils').getSafetensorsPath(args.lang)
+
+    print(f"{'mode':<18}{'load_s':>10}{'rss_before_mb':>16}{'rss_after_mb':>16}{'delta_mb':>12}{'weights_mb':>12}")
+    for mode in MODES:
+        report = runMode(args.lang, mode)
+        before = (report['rss_before_bytes'] or 0) / 2 ** 20
+        after = (report['rss_after_bytes'] or 0) / 2 ** 20
+        weights = report['model_bytes'] / 2 ** 20
+        print(f"{mode:<18}{report['seconds']:>10.3f}{before:>16.1f}{after:>16.1f}{after - before:>12.1f}{weights:>12.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+对比各生成参数配置（fast / balanced / quality）的延迟和译文质量，以 quality 配置的译文为基准。
+
+用法：
+    python benchmarks/compare_profiles.py --lang zh
+    python benchmarks/compare_profiles.py --lang zh --backend ctranslate2 --prompts prompts.txt
+"""
+import sys
+import json
+import argparse
+
+from _plugin import loadPlugin
+from compare_backends import SAMPLE_PROMPTS, runBackend, scoreAgainst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lang', default='zh')
+    parser.add_argument('--backend', default=None, help='推理后端，默认使用 PyTorch')
+    parser.add_argument('--prompts', help='每行一个提示词的文本文件')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='JSON 报告的输出路径，默认输出到标准输出')
+    args = parser.parse_args()
+
+    utils = loadPlugin('utils')
+    backends = loadPlugin('backends')
+    backend = backends.getBackend(args.backend).name
+
+    prompts = SAMPLE_PROMPTS
+    if args.prompts:
+        with open(args.prompts, encoding='utf-8') as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    results = [
+        runBackend(utils, backends, backend, prompts, args.lang, args.repeat, profile)
+        for profile in backends.GENERATION_PROFILES
+    ]
+    reference = next((r for r in results if r['profile'] == 'quality'), results[-1])
+    scoreAgainst(reference, results)
+
+    report = {'lang': args.lang, 'backend': backend, 'prompts': prompts, 'results': results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
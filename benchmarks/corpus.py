@@ -0,0 +1,48 @@
+"""基准测试使用的提示词语料，按类别划分"""
+
+SHORT_TAGS = [
+    '杰作，最高质量，1女孩',
+    '杰作, 最高质量, 超高分辨率, 1女孩, 长发, 蓝色眼睛, 微笑',
+    '风景，山，湖，日落，云',
+    '猫，可爱，毛茸茸，白色背景',
+    '最佳质量，详细，城市，夜晚，霓虹灯，雨',
+    '一个男孩、短发、校服、教室',
+    '花、樱花、春天、阳光',
+    '机器人，科幻，金属，未来城市',
+]
+
+LONG_SENTENCES = [
+    '一个穿着红色连衣裙的女孩站在樱花树下，微风吹动她的长发，背景是金色的夕阳和远处的群山。',
+    '在一个下雨的夜晚，赛博朋克风格的城市街道上到处都是霓虹灯招牌，一个穿着风衣的侦探撑着伞慢慢走过。',
+    '古老的城堡坐落在悬崖边上，海浪拍打着岩石，天空中有一群海鸥在飞翔，整个画面充满了史诗感。',
+    '一只小狐狸在雪地里玩耍，它的尾巴蓬松而柔软，周围是高大的松树，阳光透过树枝洒在雪地上。',
+]
+
+LORA_HEAVY = [
+    '<lora:detail_tweaker:0.8>, 杰作, (最高质量:1.2), <lora:anime_style:0.6>, 1女孩, (红色头发:1.1), embedding:easynegative',
+    '(杰作:1.3), <lora:lighting:0.5>, [猫|狗], 森林, BREAK, <lora:watercolor:0.7>, 水彩画, (柔和的光:0.9)',
+    '<lora:a:1>, <lora:b:1>, <lora:c:1>, <lora:d:1>, 城市, 夜景, ((霓虹灯)), <lora:e:0.4>, 下雨',
+    '((杰作)), [[模糊]], <hypernet:style:0.5>, 少女, 微笑, (阳光:1.4), 背景虚化',
+]
+
+ALL_ENGLISH = [
+    'masterpiece, best quality, 1girl, long hair, blue eyes, smile',
+    '(masterpiece:1.2), <lora:detail:0.8>, landscape, mountains, lake, sunset',
+    'a cozy cabin in the woods at night, warm light from the windows, snow, cinematic lighting',
+    'portrait of an old man, detailed skin, dramatic lighting, 85mm, bokeh',
+]
+
+CORPUS = {
+    'short_tags': SHORT_TAGS,
+    'long_sentences': LONG_SENTENCES,
+    'lora_heavy': LORA_HEAVY,
+    'all_english': ALL_ENGLISH,
+}
+
+
+def trainingLines():
+    """构建分词器时使用的文本"""
+    lines = []
+    for prompts in CORPUS.values():
+        lines += prompts
+    return lines
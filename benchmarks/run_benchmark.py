@@ -0,0 +1,210 @@
+"""
+翻译流水线的离线基准测试。
+
+默认在临时目录中生成一个随机初始化的小型 Marian 模型（见 tiny_model.py），不需要联网，也不需要下载真实模型；
+指定 --models-dir 时使用该目录下的真实模型。测试内容：
+
+- 模型冷加载耗时（load_marian_mt），一次性的 safetensors 转换在测量之前完成，单独报告
+- detectAndTranslate 以及各节点 encode 的单条延迟分位数（p50/p90/p99）和吞吐量，按语料类别统计
+- 进程峰值内存（RSS）
+
+结果以 JSON 输出，使用 --compare 与之前保存的结果对比，超过阈值的指标视为性能回退，退出码为 1。
+
+用法：
+    python benchmarks/run_benchmark.py --output bench.json
+    python benchmarks/run_benchmark.py --compare bench.json
+    python benchmarks/run_benchmark.py --models-dir ../Helsinki-NLP --lang zh
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from _plugin import PLUGIN_DIR, loadPlugin
+from corpus import CORPUS
+
+
+class NullClip:
+    """代替 ComfyUI 的 CLIP 对象，只测量节点中翻译部分的开销"""
+
+    def tokenize(self, text):
+        return text
+
+    def encode_from_tokens(self, tokens, return_pooled=False):
+        return None, None
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if len(ordered) == 0:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def peakRss():
+    """进程峰值内存（字节）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上单位是字节，Linux 上是 KB
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def summarize(latencies):
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'throughput_per_s': round(len(latencies) / total, 2) if total > 0 else None,
+    }
+
+
+def timeCalls(func, prompts, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for prompt in prompts:
+            start = time.perf_counter()
+            func(prompt)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def gitCommit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PLUGIN_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def runBenchmark(lang, repeat, use_cache):
+    utils = loadPlugin('utils')
+    prompt_node = loadPlugin('nodes.offline_prompt_translate').OfflinePromptTranslate()
+    clip_node = loadPlugin('nodes.offline_translate_clip_encode').OfflineTranslateClipEncode()
+    clip = NullClip()
+
+    utils.CACHE_ENABLED = use_cache
+    utils.MARIAN_LOADED.clear()
+
+    start = time.perf_counter()
+    if utils.LOW_MEMORY_LOADING:
+        utils.getSafetensorsPath(lang)
+    convert = time.perf_counter() - start
+
+    start = time.perf_counter()
+    utils.load_marian_mt(lang)
+    cold_load = time.perf_counter() - start
+
+    # 预热一次，排除首次 generate 的额外开销
+    utils.translate('预热', lang)
+
+    stages = {
+        'detectAndTranslate': lambda prompt: utils.detectAndTranslate(utils.removeLoraText(prompt)[0], 'auto'),
+        'OfflinePromptTranslate.encode': lambda prompt: prompt_node.encode(prompt, 'auto', True),
+        'OfflineTranslateClipEncode.encode': lambda prompt: clip_node.encode(clip, prompt, 'auto', True),
+    }
+
+    results = {}
+    for stage, func in stages.items():
+        all_latencies = []
+        per_category = {}
+        for category, prompts in CORPUS.items():
+            latencies = timeCalls(func, prompts, repeat)
+            per_category[category] = summarize(latencies)
+            all_latencies += latencies
+        results[stage] = {'overall': summarize(all_latencies), 'categories': per_category}
+
+    return {
+        'commit': gitCommit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'lang': lang,
+        'repeat': repeat,
+        'cache': use_cache,
+        'models_dir': utils.getModelsDir(),
+        'convert_s': round(convert, 4),
+        'cold_load_s': round(cold_load, 4),
+        'peak_rss_bytes': peakRss(),
+        'stages': results,
+    }
+
+
+def compareResults(baseline, current, threshold):
+    """对比两次结果，返回 (说明行, 是否有回退)。数值越小越好的指标超过 baseline * threshold 视为回退"""
+    lines = []
+    regressed = False
+
+    def check(name, old, new, lower_is_better=True):
+        nonlocal regressed
+        if not old or new is None:
+            return
+        ratio = new / old
+        bad = ratio > threshold if lower_is_better else ratio < 1 / threshold
+        regressed = regressed or bad
+        lines.append(f"{'REGRESSION' if bad else 'ok':>10}  {name}: {old} -> {new} ({ratio:.2f}x)")
+
+    check('cold_load_s', baseline.get('cold_load_s'), current.get('cold_load_s'))
+    check('peak_rss_bytes', baseline.get('peak_rss_bytes'), current.get('peak_rss_bytes'))
+    for stage, result in current['stages'].items():
+        old_stage = baseline.get('stages', {}).get(stage)
+        if old_stage is None:
+            continue
+        for category, summary in result['categories'].items():
+            old = old_stage['categories'].get(category, {})
+            check(f'{stage}[{category}].p50_ms', old.get('p50_ms'), summary['p50_ms'])
+            check(f'{stage}[{category}].p99_ms', old.get('p99_ms'), summary['p99_ms'])
+        check(f'{stage}.throughput_per_s', old_stage['overall'].get('throughput_per_s'),
+              result['overall']['throughput_per_s'], lower_is_better=False)
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', help='使用该目录下的真实模型，默认生成小型随机模型')
+    parser.add_argument('--lang', default='zh')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache', action='store_true', help='启用翻译缓存（默认关闭，测量模型本身的开销）')
+    parser.add_argument('--output', help='JSON 结果的输出路径，默认输出到标准输出')
+    parser.add_argument('--compare', help='与之前保存的 JSON 结果对比')
+    parser.add_argument('--threshold', type=float, default=1.15, help='判定为回退的比例，默认 1.15')
+    args = parser.parse_args()
+
+    if args.models_dir:
+        os.environ['PROMPT_TRANSLATOR_MODELS_DIR'] = os.path.abspath(args.models_dir)
+    else:
+        from tiny_model import buildTinyModel
+
+        models_dir = tempfile.mkdtemp(prefix='prompt-translator-bench-')
+        buildTinyModel(models_dir, args.lang)
+        os.environ['PROMPT_TRANSLATOR_MODELS_DIR'] = models_dir
+
+    result = runBenchmark(args.lang, args.repeat, args.cache)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressed = compareResults(baseline, result, args.threshold)
+        print('\n'.join(lines), file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+在本地生成一个随机初始化的小型 Marian 模型和 SentencePiece 分词器，不需要联网。
+
+模型结构取自给定的 config.json（默认使用插件自带的 opus-mt-zh-en 配置），只把层数和维度缩小，
+因此加载、分词、生成的代码路径与真实模型一致，但译文没有意义，只用于性能测试。
+
+用法：
+    python benchmarks/tiny_model.py --output /tmp/tiny-models --lang zh
+"""
+import os
+import io
+import sys
+import json
+import argparse
+
+from _plugin import PLUGIN_DIR
+from corpus import trainingLines
+
+TINY_DIMENSIONS = {
+    'd_model': 64,
+    'encoder_layers': 2,
+    'decoder_layers': 2,
+    'encoder_attention_heads': 2,
+    'decoder_attention_heads': 2,
+    'encoder_ffn_dim': 128,
+    'decoder_ffn_dim': 128,
+}
+
+
+def buildTokenizer(model_dir, vocab_size=600):
+    """训练 SentencePiece 模型并生成 MarianTokenizer 需要的 source.spm、target.spm、vocab.json"""
+    import sentencepiece as spm
+
+    lines = trainingLines()
+    lines += [line.lower() for line in lines]
+    buffer = io.BytesIO()
+    spm.SentencePieceTrainer.train(
+        sentence_iterator=iter(lines),
+        model_writer=buffer,
+        vocab_size=vocab_size,
+        hard_vocab_limit=False,
+        character_coverage=1.0,
+        model_type='unigram',
+        eos_id=0,
+        unk_id=1,
+        bos_id=-1,
+        pad_id=-1,
+    )
+    spm_bytes = buffer.getvalue()
+    for name in ('source.spm', 'target.spm'):
+        with open(os.path.join(model_dir, name), 'wb') as f:
+            f.write(spm_bytes)
+
+    processor = spm.SentencePieceProcessor(model_proto=spm_bytes)
+    vocab = {processor.id_to_piece(i): i for i in range(processor.get_piece_size())}
+    vocab['<pad>'] = len(vocab)
+    with open(os.path.join(model_dir, 'vocab.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    return vocab
+
+
+def buildTinyModel(output_dir, lang='zh', config_path=None, seed=0):
+    """在 output_dir/opus-mt-{lang}-en 下生成模型，返回模型目录"""
+    import torch
+    from transformers import MarianConfig, MarianMTModel
+
+    if config_path is None:
+        config_path = os.path.join(PLUGIN_DIR, 'Helsinki-NLP', 'opus-mt-zh-en', 'config.json')
+    with open(config_path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    model_dir = os.path.join(output_dir, f'opus-mt-{lang}-en')
+    os.makedirs(model_dir, exist_ok=True)
+    vocab = buildTokenizer(model_dir)
+    pad_id = vocab['<pad>']
+
+    config.update(TINY_DIMENSIONS)
+    config.update({
+        'vocab_size': len(vocab),
+        'decoder_vocab_size': len(vocab),
+        'pad_token_id': pad_id,
+        'decoder_start_token_id': pad_id,
+        'bad_words_ids': [[pad_id]],
+        'eos_token_id': 0,
+        'forced_eos_token_id': 0,
+        'max_position_embeddings': 512,
+    })
+    for key in ('_name_or_path', 'architectures', 'transformers_version', 'extra_pos_embeddings'):
+        config.pop(key, None)
+
+    torch.manual_seed(seed)
+    model = MarianMTModel(MarianConfig(**config))
+    model.eval()
+    # 与 Helsinki-NLP 发布的模型一样保存为 pytorch_model.bin
+    model.save_pretrained(model_dir, safe_serialization=False)
+    with open(os.path.join(model_dir, 'tokenizer_config.json'), 'w', encoding='utf-8') as f:
+        json.dump({'source_lang': lang, 'target_lang': 'en', 'model_max_length': 512}, f)
+    return model_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', required=True, help='模型输出目录，可作为 PROMPT_TRANSLATOR_MODELS_DIR 使用')
+    parser.add_argument('--lang', default='zh')
+    parser.add_argument('--config', help='模型结构配置，默认使用插件自带的 opus-mt-zh-en/config.json')
+    args = parser.parse_args()
+    print(buildTinyModel(args.output, args.lang, args.config))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""
+离线批量预翻译。
+
+把工作流 JSON 中翻译节点的提示词、CSV/JSONL 数据集中的提示词预先翻译成英文，之后执行工作流时不再需要翻译。
+翻译流程与节点相同（removeLoraText -> detectAndTranslateMany -> restoreLoraText），LoRA 标签保留在原位，由节点按自己的设置处理。
+
+- 工作流（.json）：支持界面保存的格式（nodes/widgets_values）和 API 格式（class_type/inputs），只修改翻译节点的 text；
+- 数据集（.csv/.jsonl）：逐行流式读取，按 --batch 行一批分发给多个进程翻译，按原顺序逐批写入结果；
+- 断点续传：每写完一批都会在 <输出文件>.progress 中记录已完成的行数和输出文件的长度，中断后重新执行同一命令从断点继续，
+  已完成的工作流文件不会重复处理。
+
+在插件目录中运行：
+
+    python -m bulk_translate workflows/ --output translated/
+    python -m bulk_translate prompts.csv --column prompt --output translated/ --processes 4
+    python -m bulk_translate prompts.jsonl --column prompt --column negative --output translated/
+"""
+import io
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from collections import deque
+
+# 翻译节点及其提示词在 widgets_values 中的位置：(text, from_lang)
+TRANSLATOR_NODES = {
+    'offline_prompt_translate': (0, 1),
+    'offline_translate_clip_encode': (0, 1),
+    'batch_prompt_translate': (0, 1),
+    'CJK_clip_encode': (0, 1),
+}
+MULTILINE_NODES = ('batch_prompt_translate',)  # text 中的每一行是一个提示词
+WORKFLOW_EXTENSIONS = ('.json',)
+DATASET_EXTENSIONS = ('.csv', '.jsonl')
+
+_utils = None
+
+
+class UntranslatedError(RuntimeError):
+    """有片段没有翻译成功（没有模型、模型加载或翻译失败）"""
+
+
+def loadUtils(threads=None):
+    """导入插件的 utils（插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册）"""
+    global _utils
+    if _utils is None:
+        import types
+        import importlib
+
+        plugin_dir = os.path.dirname(os.path.abspath(__file__))
+        if 'PromptTranslator' not in sys.modules:
+            sys.path = [path for path in sys.path if os.path.abspath(path or '.') != plugin_dir]
+            package = types.ModuleType('PromptTranslator')
+            package.__path__ = [plugin_dir]
+            sys.modules['PromptTranslator'] = package
+        os.environ.setdefault('PROMPT_TRANSLATOR_WORKERS', '0')  # 本工具自己管理进程
+        _utils = importlib.import_module('PromptTranslator.utils')
+    if threads:
+        try:
+            import torch
+
+            torch.set_num_threads(threads)
+        except (ImportError, RuntimeError):
+            pass
+    return _utils
+
+
+def sourceLanguage(from_lang):
+    """把命令行或节点中的源语言（语言代码或下拉框的选项）转换为语言代码，无法识别或没有安装对应模型时抛出 ValueError"""
+    if from_lang == 'auto':
+        return 'auto'
+    utils = loadUtils()
+    lang = utils.languageCode(from_lang)
+    if lang == 'auto' or lang not in utils.installedLanguages():
+        raise ValueError(f'No model installed for source language {from_lang!r} in {utils.getModelsDir()}')
+    return lang
+
+
+def translatePrompts(prompts, from_lang='auto'):
+    """
+    翻译一组提示词，LoRA 标签原样保留。返回 (译文列表, 翻译失败的片段数)，翻译失败的片段保留原文。
+    无法识别源语言时抛出 ValueError，见 sourceLanguage。
+    """
+    utils = loadUtils()
+    lang = sourceLanguage(from_lang)
+    failed = 0
+
+    def translator(texts, lang):
+        nonlocal failed
+        translated = utils.translateSegments(texts, lang)
+        failed += sum(1 for text in translated if text is None)
+        return translated
+
+    removed = [utils.removeLoraText(prompt) for prompt in prompts]
+    translated = utils.detectAndTranslateMany(
+        [text for text, _ in removed], lang, translator=translator
+    )
+    return [utils.restoreLoraText(text, matches, False) for text, (_, matches) in zip(translated, removed)], failed
+
+
+def _splitLines(assign, text, from_lang):
+    """把多行文本拆成每行一个提示词，设置某一行的译文时保留换行符并写回整段文本"""
+    lines = text.splitlines(keepends=True)
+    items = []
+    for index, line in enumerate(lines):
+        content = line.rstrip('\r\n')
+
+        def assignLine(new_text, index=index, ending=line[len(content):]):
+            lines[index] = new_text + ending
+            assign(''.join(lines))
+
+        items.append((assignLine, content, from_lang))
+    return items
+
+
+def findWorkflowPrompts(workflow):
+    """
+    找出工作流中翻译节点的提示词，返回 [(设置函数, 提示词, 源语言), ...]。
+
+    支持界面保存的格式 {"nodes": [{"type", "widgets_values"}]} 和 API 格式 {"id": {"class_type", "inputs"}}。
+    """
+    found = []
+    if isinstance(workflow, dict) and isinstance(workflow.get('nodes'), list):
+        for node in workflow['nodes']:
+            positions = TRANSLATOR_NODES.get(node.get('type')) if isinstance(node, dict) else None
+            values = node.get('widgets_values') if positions else None
+            if not isinstance(values, list) or len(values) <= positions[0] or not isinstance(values[positions[0]], str):
+                continue
+            from_lang = values[positions[1]] if len(values) > positions[1] else 'auto'
+
+            def assign(text, values=values, index=positions[0]):
+                values[index] = text
+
+            if node.get('type') in MULTILINE_NODES:
+                found += _splitLines(assign, values[positions[0]], from_lang)
+            else:
+                found.append((assign, values[positions[0]], from_lang))
+    elif isinstance(workflow, dict):
+        for node in workflow.values():
+            if not isinstance(node, dict) or node.get('class_type') not in TRANSLATOR_NODES:
+                continue
+            inputs = node.get('inputs') or {}
+            # 连接到其他节点的输入是 [节点 id, 输出序号]，不是文本
+            if not isinstance(inputs.get('text'), str):
+                continue
+
+            def assign(text, inputs=inputs):
+                inputs['text'] = text
+
+            from_lang = inputs.get('from_lang')
+            from_lang = from_lang if isinstance(from_lang, str) else 'auto'
+            if node['class_type'] in MULTILINE_NODES:
+                found += _splitLines(assign, inputs['text'], from_lang)
+            else:
+                found.append((assign, inputs['text'], from_lang))
+    return found
+
+
+def translateWorkflowFile(source, output, allow_untranslated=False):
+    """
+    翻译一个工作流文件，先写临时文件再替换，返回 (提示词数, 翻译失败的片段数)，不是有效 JSON 的文件跳过并返回 (0, 0)。
+    有片段翻译失败且 allow_untranslated 为 False 时不写输出文件，下次执行时重新翻译。
+    """
+    try:
+        with open(source, encoding='utf-8') as f:
+            workflow = json.load(f)
+    except ValueError as e:
+        print(f'Skipping {source}: {e}', file=sys.stderr)
+        return 0, 0
+    prompts = [item for item in findWorkflowPrompts(workflow) if item[1].strip()]
+    groups = {}
+    for item in prompts:
+        groups.setdefault(item[2], []).append(item)
+    failed = 0
+    for from_lang, items in groups.items():
+        try:
+            translated, group_failed = translatePrompts([item[1] for item in items], from_lang)
+        except ValueError as e:
+            # 节点的源语言无法识别时不按自动检测翻译，这些提示词记为翻译失败
+            print(f'{source}: {e}', file=sys.stderr)
+            failed += len(items)
+            continue
+        failed += group_failed
+        for (assign, _, _), text in zip(items, translated):
+            assign(text)
+    if failed > 0 and not allow_untranslated:
+        print(f'Not writing {output}: {failed} segments failed to translate', file=sys.stderr)
+        return len(prompts), failed
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    tmp_path = output + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(workflow, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, output)
+    return len(prompts), failed
+
+
+def readProgress(output):
+    try:
+        with open(output + '.progress', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'rows': 0, 'bytes': 0, 'failed': 0, 'done': False}
+
+
+def writeProgress(output, progress):
+    tmp_path = output + '.progress.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, output + '.progress')
+
+
+def iterRows(source, kind):
+    """逐行读取数据集：CSV 返回 (表头, 行字典的迭代器)，JSONL 的行为字典，无法解析的行为原始字符串"""
+    f = open(source, encoding='utf-8-sig', newline='')
+    if kind == '.csv':
+        reader = csv.DictReader(f)
+        return reader.fieldnames or [], (row for row in reader)
+
+    def lines():
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line.rstrip('\r\n')
+
+    return None, lines()
+
+
+def renderRows(rows, kind, fieldnames):
+    buffer = io.StringIO()
+    if kind == '.csv':
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore', lineterminator='\n')
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            buffer.write((row if isinstance(row, str) else json.dumps(row, ensure_ascii=False)) + '\n')
+    return buffer.getvalue().encode('utf-8')
+
+
+def translateDataset(source, output, columns, from_lang, run, batch_rows, window, allow_untranslated=False):
+    """
+    流式翻译一个数据集，返回 (本次翻译的行数, 输出文件中保留原文的失败片段数)。
+
+    run(prompts, from_lang) 返回一个带 get() 方法的结果，get() 返回 translatePrompts 的结果，
+    最多同时有 window 批在翻译，结果按输入顺序写入。
+    某一批有片段翻译失败且 allow_untranslated 为 False 时不写入该批并抛出 UntranslatedError，进度停在上一批，
+    安装模型后重新执行即可从该批继续；allow_untranslated 为 True 时失败的片段保留原文。
+    """
+    kind = os.path.splitext(source)[1].lower()
+    progress = readProgress(output)
+    if progress.get('done'):
+        return 0, 0
+
+    fieldnames, rows = iterRows(source, kind)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    out = open(output, 'r+b' if os.path.exists(output) else 'wb')
+    # 丢弃上次中断时写了一半的内容
+    out.truncate(progress['bytes'])
+    out.seek(progress['bytes'])
+    if kind == '.csv' and progress['bytes'] == 0:
+        out.write(renderRows([dict(zip(fieldnames, fieldnames))], kind, fieldnames))
+
+    def flush(batch, positions, result):
+        translated, failed = result.get()
+        if failed > 0 and not allow_untranslated:
+            raise UntranslatedError(
+                f'{failed} segments failed to translate after row {progress["rows"]} of {source}'
+            )
+        progress['failed'] = progress.get('failed', 0) + failed
+        for (row, column), text in zip(positions, translated):
+            row[column] = text
+        out.write(renderRows(batch, kind, fieldnames))
+        out.flush()
+        os.fsync(out.fileno())
+        progress['rows'] += len(batch)
+        progress['bytes'] = out.tell()
+        writeProgress(output, progress)
+
+    resume_rows = progress['rows']
+    skipped = 0
+    translated_rows = 0
+    pending = deque()
+    batch = []
+
+    def submit(batch):
+        positions = [
+            (row, column) for row in batch if isinstance(row, dict)
+            for column in columns if isinstance(row.get(column), str) and row[column].strip()
+        ]
+        pending.append((batch, positions, run([row[column] for row, column in positions], from_lang)))
+        while len(pending) >= window:
+            flush(*pending.popleft())
+
+    try:
+        for row in rows:
+            if skipped < resume_rows:
+                skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                translated_rows += len(batch)
+                submit(batch)
+                batch = []
+        if batch:
+            translated_rows += len(batch)
+            submit(batch)
+        while pending:
+            flush(*pending.popleft())
+        progress['done'] = True
+        writeProgress(output, progress)
+    finally:
+        out.close()
+    return translated_rows, progress['failed']
+
+
+class _InProcessResult:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def collectInputs(paths, output_dir):
+    """返回 [(源文件, 输出文件, 类型)]，目录中的文件按相对路径输出"""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    source = os.path.join(root, name)
+                    inputs.append((source, os.path.join(output_dir, os.path.relpath(source, path))))
+        else:
+            inputs.append((path, os.path.join(output_dir, os.path.basename(path))))
+    result = []
+    for source, output in inputs:
+        kind = os.path.splitext(source)[1].lower()
+        if kind in WORKFLOW_EXTENSIONS + DATASET_EXTENSIONS and os.path.abspath(source) != os.path.abspath(output):
+            result.append((source, output, kind))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='工作流 JSON、CSV、JSONL 文件或包含这些文件的目录')
+    parser.add_argument('--output', required=True, help='输出目录，输入为目录时保持相对路径')
+    parser.add_argument('--column', action='append', help='数据集中需要翻译的列（可以指定多次），默认为 prompt')
+    parser.add_argument('--from-lang', default='auto', help='源语言代码或节点中的语言名称（如 中文、日文），默认自动检测')
+    parser.add_argument('--processes', type=int, default=2, help='翻译进程数，每个进程加载一份模型，默认 2')
+    parser.add_argument('--threads', type=int, default=2, help='每个进程的 PyTorch 线程数，默认 2')
+    parser.add_argument('--batch', type=int, default=256, help='数据集每批的行数，默认 256')
+    parser.add_argument('--allow-untranslated', action='store_true',
+                        help='有片段翻译失败时保留原文继续写入，默认停止并且不记录为已完成')
+    args = parser.parse_args()
+
+    columns = args.column or ['prompt']
+    inputs = collectInputs(args.inputs, args.output)
+    if len(inputs) == 0:
+        print('No .json, .csv or .jsonl input found', file=sys.stderr)
+        return 1
+
+    pool = None
+    if args.processes > 1:
+        import multiprocessing
+
+        pool = multiprocessing.Pool(args.processes, initializer=loadUtils, initargs=(args.threads,))
+        run = lambda prompts, from_lang: pool.apply_async(translatePrompts, (prompts, from_lang))  # noqa: E731
+    else:
+        run = lambda prompts, from_lang: _InProcessResult(translatePrompts(prompts, from_lang))  # noqa: E731
+
+    status = 0
+    try:
+        # 没有可用的模型时所有提示词都会原样输出，开始前检查。在创建进程池之后导入 utils，子进程不会复制主进程的后台线程
+        utils = loadUtils(args.threads)
+        if len(utils.installedLanguages()) == 0:
+            print(f'No translation model installed in {utils.getModelsDir()}', file=sys.stderr)
+            return 1
+        try:
+            sourceLanguage(args.from_lang)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+        start = time.perf_counter()
+        workflows = [(source, output) for source, output, kind in inputs if kind in WORKFLOW_EXTENSIONS]
+        todo = [(source, output, args.allow_untranslated) for source, output in workflows if not os.path.exists(output)]
+        if todo:
+            if pool is not None:
+                counts = pool.starmap(translateWorkflowFile, todo, chunksize=1)
+            else:
+                counts = [translateWorkflowFile(*item) for item in todo]
+            failed = sum(failed for _, failed in counts)
+            print(f'{len(todo)} workflows, {sum(prompts for prompts, _ in counts)} prompts '
+                  f'({len(workflows) - len(todo)} already done), {failed} segments failed', file=sys.stderr)
+            if failed > 0 and not args.allow_untranslated:
+                status = 1
+
+        for source, output, kind in inputs:
+            if kind not in DATASET_EXTENSIONS:
+                continue
+            try:
+                rows, failed = translateDataset(
+                    source, output, columns, args.from_lang, run, args.batch, args.processes * 2, args.allow_untranslated
+                )
+            except UntranslatedError as e:
+                print(f'{e}; install the missing model and rerun to resume, or pass --allow-untranslated',
+                      file=sys.stderr)
+                status = 1
+                continue
+            elapsed = time.perf_counter() - start
+            print(f'{source}: {rows} rows translated ({rows / elapsed:.1f} rows/s), {failed} segments failed',
+                  file=sys.stderr)
+    finally:
+        if pool is not None:
+            # 所有结果都已取回，未取回的只有出错后丢弃的批次
+            pool.terminate()
+            pool.join()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import weakref
+import threading
+from collections import OrderedDict
+from .metrics import count
+
+CONDITIONING_CACHE_BYTES = 256 * 1024 * 1024  # 条件编码缓存占用的最大内存（字节）
+
+
+def tensorBytes(tensor):
+    if tensor is None:
+        return 0
+    return tensor.element_size() * tensor.nelement()
+
+
+def clipFingerprint(clip):
+    """
+    生成 CLIP 对象的稳定标识：底层文本编码模型 + clip skip 层 + 当前打过的补丁（LoRA 等）。
+
+    同一个 CLIP 模型打了不同的 LoRA 或设置了不同的 clip skip 时标识不同。
+    """
+    patcher = getattr(clip, 'patcher', None)
+    patches_id = getattr(patcher, 'patches_uuid', None)
+    if patches_id is None and patcher is not None:
+        patches = getattr(patcher, 'patches', {}) or {}
+        patches_id = tuple(sorted(
+            (key, tuple((p[0], id(p[1])) for p in value)) for key, value in patches.items()
+        ))
+    model = getattr(clip, 'cond_stage_model', clip)
+    return (id(model), getattr(clip, 'layer_idx', None), str(patches_id))
+
+
+class ConditioningCache:
+    """
+    CLIP 条件编码缓存：以最终送入 CLIP 的文本和 CLIP 标识为键，缓存 (cond, pooled) 张量。
+
+    按张量占用的字节数做 LRU 淘汰。条目持有底层模型的弱引用，模型被释放后对应条目不再命中。
+    """
+
+    def __init__(self, max_bytes=CONDITIONING_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clip, text):
+        key = (clipFingerprint(clip), text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is getattr(clip, 'cond_stage_model', clip):
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1], entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, clip, text, cond, pooled):
+        size = tensorBytes(cond) + tensorBytes(pooled)
+        if size > self.max_bytes:
+            return
+        key = (clipFingerprint(clip), text)
+        try:
+            ref = weakref.ref(getattr(clip, 'cond_stage_model', clip))
+        except TypeError:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (ref, cond, pooled, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.used_bytes -= entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+
+CONDITIONING_CACHE = ConditioningCache()
+
+
+def encodeText(clip, text, use_cache=False):
+    """对文本进行 CLIP 编码，use_cache 为 True 时优先使用缓存的编码结果"""
+    if use_cache:
+        cached = CONDITIONING_CACHE.get(clip, text)
+        if cached is not None:
+            count('conditioning_cache_hits')
+            return cached
+
+    tokens = clip.tokenize(text)
+    cond, pooled = clip.encode_from_tokens(tokens, return_pooled=True)
+
+    if use_cache:
+        CONDITIONING_CACHE.put(clip, text, cond, pooled)
+    return cond, pooled
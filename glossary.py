@@ -0,0 +1,241 @@
+"""
+用户词库（翻译记忆）。
+
+词库文件放在 Helsinki-NLP 旁边的 glossary 目录中，支持 CSV 和 JSON：
+
+    glossary/*.csv、glossary/*.json          所有语言通用
+    glossary/<语言>/*.csv、*.json            只用于该语言，同名词条覆盖通用词库
+
+CSV 每行为 `原文,译文`，空行和以 # 开头的行会被忽略；JSON 为 {"原文": "译文"} 或 [["原文", "译文"], ...]。
+所有词条编译为一个 Aho-Corasick 自动机，一次扫描找出片段中的全部词条：
+
+- 整个片段就是一个词条时直接返回译文，不调用模型；
+- 片段中包含词条时，在词条处把片段切开，只把词条之间的文本交给模型翻译，词条直接使用词库译文，不经过模型。
+"""
+import os
+import csv
+import json
+import time
+import threading
+from .translation_cache import normalizeSegment
+from .language_detect import charScript
+
+GLOSSARY_EXTENSIONS = ('.csv', '.json')
+GLOSSARY_CHECK_INTERVAL = 2  # 检查词库文件是否变化的最短间隔（秒）
+
+# 这些文字系统的词之间没有空格，词条可以出现在任意位置
+_UNSPACED_SCRIPTS = ('Han', 'Kana', 'Hangul', 'Thai')
+
+
+def _isWordChar(char):
+    return char.isalnum() and charScript(char) not in _UNSPACED_SCRIPTS
+
+
+def _foldText(text):
+    """规范化并转为小写；小写后长度改变的文本（极少数字符）保持原样，保证匹配位置不变"""
+    text = normalizeSegment(text)
+    folded = text.lower()
+    return text, folded if len(folded) == len(text) else text
+
+
+class Automaton:
+    """Aho-Corasick 自动机，finditer 返回所有匹配的 (起点, 终点)，耗时与文本长度和匹配数成线性关系"""
+
+    def __init__(self, keys):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]  # 每个状态结束的词条长度，包括失败链上的词条
+        for key in keys:
+            self._insert(key)
+        self._build()
+
+    def _insert(self, key):
+        state = 0
+        for char in key:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.goto[state][char] = next_state
+            state = next_state
+        if len(key) not in self.output[state]:
+            self.output[state] += (len(key),)
+
+    def _build(self):
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.output[next_state] += self.output[self.fail[next_state]]
+                queue.append(next_state)
+
+    def finditer(self, text):
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length in self.output[state]:
+                yield end - length, end
+
+
+class Glossary:
+    """一种语言的词库：{规范化后的小写原文: 译文}"""
+
+    def __init__(self, terms=None):
+        self.terms = {}
+        for source, target in (terms or {}).items():
+            key = _foldText(source)[1]
+            if key and target:
+                self.terms[key] = target
+        self.automaton = Automaton(self.terms) if self.terms else None
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, text):
+        """整个片段是词条时返回译文，否则返回 None"""
+        if not self.terms:
+            return None
+        return self.terms.get(_foldText(text)[1])
+
+    def split(self, text):
+        """
+        在词条处切分片段，返回 [(文本, 词条译文), ...]，按顺序拼接各部分的文本即为原片段。
+
+        词条部分的词条译文为词库中的译文，词条之间的文本为 None，需要模型翻译；没有词条时返回 [(text, None)]。
+        重叠的词条取最靠左、最长的一个；空格分词的文字（拉丁、西里尔等）只匹配完整的单词。
+        """
+        if self.automaton is None:
+            return [(text, None)]
+        text, folded = _foldText(text)
+        matches = []
+        for start, end in self.automaton.finditer(folded):
+            if start > 0 and _isWordChar(folded[start]) and _isWordChar(folded[start - 1]):
+                continue
+            if end < len(folded) and _isWordChar(folded[end - 1]) and _isWordChar(folded[end]):
+                continue
+            matches.append((start, end))
+        if len(matches) == 0:
+            return [(text, None)]
+
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        parts = []
+        position = 0
+        for start, end in matches:
+            if start < position:
+                continue
+            if start > position:
+                parts.append((text[position:start], None))
+            parts.append((text[start:end], self.terms[folded[start:end]]))
+            position = end
+        if position < len(text):
+            parts.append((text[position:], None))
+        return parts
+
+
+def readGlossaryFile(path):
+    """读取一个词库文件，返回 [(原文, 译文), ...]"""
+    entries = []
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        items = data.items() if isinstance(data, dict) else data
+        for item in items:
+            if isinstance(item, dict):
+                item = (item.get('source'), item.get('target'))
+            if len(item) >= 2 and isinstance(item[0], str) and isinstance(item[1], str):
+                entries.append((item[0], item[1]))
+        return entries
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].strip().startswith('#'):
+                continue
+            source, target = row[0].strip(), row[1].strip()
+            if source and target:
+                entries.append((source, target))
+    return entries
+
+
+class GlossaryStore:
+    """
+    按语言缓存编译好的词库。
+
+    每次取用时（最多每 GLOSSARY_CHECK_INTERVAL 秒一次）检查词库文件的修改时间和大小，有变化时重新加载，不需要重启 ComfyUI。
+    """
+
+    def __init__(self, directory, log=None):
+        self.directory = directory  # 目录路径，或返回目录路径的函数
+        self.log = log
+        self._signature = None
+        self._checked = 0.0
+        self._files = {}  # 语言（通用词库为 None）-> [文件路径, ...]
+        self._glossaries = {}
+        self._lock = threading.Lock()
+
+    def _directory(self):
+        return self.directory() if callable(self.directory) else self.directory
+
+    def _scan(self, directory):
+        files = {}
+        signature = []
+        if not os.path.isdir(directory):
+            return files, ()
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                lang_files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(GLOSSARY_EXTENSIONS)]
+                if lang_files:
+                    files[name] = lang_files
+            elif name.endswith(GLOSSARY_EXTENSIONS):
+                files.setdefault(None, []).append(path)
+        for paths in files.values():
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return files, (directory, tuple(signature))
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked < GLOSSARY_CHECK_INTERVAL:
+            return
+        self._checked = now
+        files, signature = self._scan(self._directory())
+        if signature != self._signature:
+            self._signature = signature
+            self._files = files
+            self._glossaries = {}
+
+    def _load(self, paths):
+        terms = {}
+        for path in paths:
+            try:
+                terms.update(readGlossaryFile(path))
+            except (OSError, ValueError, csv.Error) as e:
+                if self.log is not None:
+                    self.log(f"词库文件 {path} 读取失败：{e}")
+        return Glossary(terms)
+
+    def get(self, from_lang):
+        """返回该语言的词库（通用词库 + 该语言的词库），没有词库文件时返回空词库"""
+        with self._lock:
+            self._refresh()
+            glossary = self._glossaries.get(from_lang)
+            if glossary is None:
+                glossary = self._load(self._files.get(None, []) + self._files.get(from_lang, []))
+                self._glossaries[from_lang] = glossary
+            return glossary
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+            self._glossaries = {}
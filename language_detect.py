@@ -0,0 +1,111 @@
+import threading
+import unicodedata
+from functools import lru_cache
+
+# 各文字系统可能对应的语言，按优先级排列
+SCRIPT_LANGUAGES = {
+    'Hangul': ['ko'],
+    'Kana': ['ja'],
+    'Han': ['zh', 'ja', 'ko'],
+    'Cyrillic': ['ru', 'uk', 'bg', 'be', 'mk', 'sr'],
+    'Arabic': ['ar', 'fa', 'ur'],
+    'Thai': ['th'],
+    'Hebrew': ['he'],
+    'Greek': ['el'],
+}
+
+
+def charScript(char):
+    """返回字符所属的文字系统，拉丁字母、数字和标点返回 None"""
+    code = ord(char)
+    if code < 0x0370:
+        return None
+    if 0x0370 <= code <= 0x03FF:
+        return 'Greek'
+    if 0x0400 <= code <= 0x052F:
+        return 'Cyrillic'
+    if 0x0590 <= code <= 0x05FF:
+        return 'Hebrew'
+    if 0x0600 <= code <= 0x06FF or 0x0750 <= code <= 0x077F:
+        return 'Arabic'
+    if 0x0E00 <= code <= 0x0E7F:
+        return 'Thai'
+    if 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F or 0xAC00 <= code <= 0xD7AF:
+        return 'Hangul'
+    if 0x3040 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF or 0xFF66 <= code <= 0xFF9F:
+        return 'Kana'
+    if 0x3400 <= code <= 0x4DBF or 0x4E00 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF or 0x20000 <= code <= 0x2FA1F:
+        return 'Han'
+    return None
+
+
+def scriptCounts(text):
+    counts = {}
+    for char in text:
+        script = charScript(char)
+        if script is not None:
+            counts[script] = counts.get(script, 0) + 1
+    return counts
+
+
+class LanguageDetector:
+    """
+    分层的语言检测：
+
+    1. 按 Unicode 文字系统直接判定（汉字/假名/谚文/西里尔字母等），绝大多数片段在这一步完成；
+    2. 整个提示词的判定结果作为片段的提示，例如提示词中出现假名时，纯汉字片段按日文处理；
+    3. 只有无法按文字系统判定的片段才交给 langid，并且只在已安装模型的语言和英文中选择。
+
+    检测结果会被缓存。
+    """
+
+    def __init__(self, languages):
+        self.languages = list(languages)
+        self._identifier = None
+        self._lock = threading.Lock()
+        self.detect = lru_cache(maxsize=8192)(self._detect)
+
+    def _pick(self, script):
+        candidates = SCRIPT_LANGUAGES.get(script, [])
+        for lang in candidates:
+            if lang in self.languages:
+                return lang
+        return candidates[0] if candidates else None
+
+    def promptHint(self, text):
+        """整个提示词的语言判定，用于无法单独判定的片段"""
+        counts = scriptCounts(text)
+        if len(counts) == 0:
+            return None
+        if 'Kana' in counts and 'ja' in self.languages:
+            return 'ja'
+        if 'Hangul' in counts and 'ko' in self.languages:
+            return 'ko'
+        return self._pick(max(counts, key=counts.get))
+
+    def _detect(self, text, hint=None):
+        counts = scriptCounts(text)
+        if counts:
+            if 'Kana' in counts:
+                return 'ja'
+            if 'Hangul' in counts:
+                return 'ko'
+            script = max(counts, key=counts.get)
+            if script == 'Han' and hint in SCRIPT_LANGUAGES['Han']:
+                return hint
+            return self._pick(script)
+        return self.classify(text)
+
+    def classify(self, text):
+        """使用 langid 分类，候选语言限制为已安装模型的语言和英文"""
+        with self._lock:
+            if self._identifier is None:
+                from langid.langid import LanguageIdentifier, model
+
+                identifier = LanguageIdentifier.from_modelstring(model, norm_probs=False)
+                supported = set(identifier.nb_classes)
+                languages = [lang for lang in set(self.languages + ['en']) if lang in supported]
+                if len(languages) > 1:
+                    identifier.set_languages(languages)
+                self._identifier = identifier
+            return self._identifier.classify(unicodedata.normalize('NFKC', text))[0]
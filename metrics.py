@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+METRICS_ENABLED = True  # 记录各阶段耗时和计数，开销只有每个阶段两次计时，可以在生产环境常开
+METRICS_FLUSH_INTERVAL = 10  # Prometheus 指标文件最短的写入间隔（秒）
+
+_current_trace = contextvars.ContextVar('prompt_translator_trace', default=None)
+
+
+class Trace:
+    """一次节点执行的各阶段耗时和计数"""
+
+    __slots__ = ('node', 'stages', 'counters', 'start', 'total')
+
+    def __init__(self, node):
+        self.node = node
+        self.stages = {}
+        self.counters = {}
+        self.start = time.perf_counter()
+        self.total = None
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self):
+        return {
+            'node': self.node,
+            'total_ms': round((self.total or 0.0) * 1000, 3),
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+@contextmanager
+def trace(node):
+    """在节点的 encode 中使用，记录本次执行的所有阶段，结束后汇总到全局指标"""
+    if not METRICS_ENABLED:
+        yield None
+        return
+    current = Trace(node)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        current.total = time.perf_counter() - current.start
+        METRICS.observe(current)
+
+
+@contextmanager
+def stage(name):
+    """记录一个阶段的耗时，没有正在进行的 trace 时不做任何事"""
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.add(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    """累加当前 trace 的计数，例如翻译片段数、缓存命中数、输入输出 token 数"""
+    current = _current_trace.get()
+    if current is not None:
+        current.count(name, n)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """全局累计指标，可以输出为 Prometheus 文本格式"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.executions = {}  # node -> [次数, 总耗时]
+        self.stages = {}  # (node, stage) -> [次数, 总耗时]
+        self.counters = {}  # (node, name) -> 累计值
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def observe(self, current):
+        with self._lock:
+            execution = self.executions.setdefault(current.node, [0, 0.0])
+            execution[0] += 1
+            execution[1] += current.total or 0.0
+            for name, seconds in current.stages.items():
+                entry = self.stages.setdefault((current.node, name), [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+            for name, value in current.counters.items():
+                key = (current.node, name)
+                self.counters[key] = self.counters.get(key, 0) + value
+            due = self.path and time.time() - self._last_flush >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def prometheus(self):
+        with self._lock:
+            lines = [
+                '# HELP prompt_translator_executions_seconds Node execution time.',
+                '# TYPE prompt_translator_executions_seconds summary',
+            ]
+            for node, (n, seconds) in sorted(self.executions.items()):
+                lines.append(f'prompt_translator_executions_seconds_sum{{node="{_escape(node)}"}} {seconds:.6f}')
+                lines.append(f'prompt_translator_executions_seconds_count{{node="{_escape(node)}"}} {n}')
+            lines += [
+                '# HELP prompt_translator_stage_seconds Time spent in each translation stage.',
+                '# TYPE prompt_translator_stage_seconds summary',
+            ]
+            for (node, name), (n, seconds) in sorted(self.stages.items()):
+                labels = f'node="{_escape(node)}",stage="{_escape(name)}"'
+                lines.append(f'prompt_translator_stage_seconds_sum{{{labels}}} {seconds:.6f}')
+                lines.append(f'prompt_translator_stage_seconds_count{{{labels}}} {n}')
+            lines += [
+                '# HELP prompt_translator_events_total Counters such as segments translated, cache hits and tokens.',
+                '# TYPE prompt_translator_events_total counter',
+            ]
+            for (node, name), value in sorted(self.counters.items()):
+                lines.append(f'prompt_translator_events_total{{node="{_escape(node)}",event="{_escape(name)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """把指标写入文件，先写临时文件再替换，读取方不会读到写了一半的内容"""
+        if not self.path:
+            return
+        self._last_flush = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+METRICS = MetricsRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'metrics.prom'))
+
+
+def registerMetricsRoute():
+    """在 ComfyUI 的服务器上注册 /prompt_translator/metrics，返回 Prometheus 文本格式的指标"""
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except ImportError:
+        return False
+
+    @PromptServer.instance.routes.get('/prompt_translator/metrics')
+    async def metrics_route(request):
+        return web.Response(text=METRICS.prometheus(), content_type='text/plain', charset='utf-8')
+
+    return True
@@ -0,0 +1,209 @@
+"""
+已安装模型清单。
+
+扫描模型目录下的 opus-mt-{源语言}-en 模型，记录每个模型的源语言、文件路径、大小和修改时间，保存在 cache/model_manifest.json。
+生成清单只读取文件属性，不读取模型文件，启动和构建节点下拉框时不会被大文件阻塞。文件的内容哈希在第一次需要模型标识时
+（翻译缓存、模型转换）才计算并写入清单；大小和修改时间没有变化时沿用清单中的哈希，重启后直接使用磁盘上的清单。
+
+多语言模型（源语言为 mul，如 opus-mt-mul-en）翻译所有没有专用模型的语言，这些语言共用同一个常驻模型。
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+MANIFEST_VERSION = 1
+MANIFEST_CHECK_INTERVAL = 2  # 检查模型目录是否变化的最短间隔（秒）
+MULTILINGUAL_SOURCES = ('mul',)  # 多语言模型的源语言代码
+
+# 节点下拉框中显示的语言名称，多语言模型可以翻译这里列出的所有语言
+LANGUAGE_NAMES = {
+    'zh': '中文',
+    'ja': '日本語',
+    'ko': '한국어',
+    'ru': 'Русский',
+    'uk': 'Українська',
+    'de': 'Deutsch',
+    'fr': 'Français',
+    'es': 'Español',
+    'it': 'Italiano',
+    'pt': 'Português',
+    'nl': 'Nederlands',
+    'pl': 'Polski',
+    'tr': 'Türkçe',
+    'ar': 'العربية',
+    'he': 'עברית',
+    'el': 'Ελληνικά',
+    'th': 'ไทย',
+    'vi': 'Tiếng Việt',
+    'id': 'Bahasa Indonesia',
+    'hi': 'हिन्दी',
+}
+
+modelDirRegex = re.compile(r'^opus-mt-(.+)-en$')
+
+
+def fileSha1(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scanModelFiles(models_dir):
+    """返回 {模型名: {文件名: (大小, 修改时间)}}，只统计模型目录第一层的文件"""
+    models = {}
+    if not os.path.isdir(models_dir):
+        return models
+    for name in sorted(os.listdir(models_dir)):
+        model_path = os.path.join(models_dir, name)
+        if not modelDirRegex.match(name) or not os.path.isdir(model_path):
+            continue
+        files = {}
+        for file_name in sorted(os.listdir(model_path)):
+            try:
+                stat = os.stat(os.path.join(model_path, file_name))
+            except OSError:
+                continue
+            if os.path.isfile(os.path.join(model_path, file_name)):
+                files[file_name] = (stat.st_size, stat.st_mtime_ns)
+        models[name] = files
+    return models
+
+
+class ModelManifest:
+    """
+    模型清单，取用时（最多每 MANIFEST_CHECK_INTERVAL 秒一次）检查模型文件的大小和修改时间，有变化时重新生成。
+
+    models_dir 为目录路径或返回目录路径的函数，path 为清单文件的保存路径。
+    """
+
+    def __init__(self, models_dir, path, log=None):
+        self.models_dir = models_dir
+        self.path = path
+        self.log = log
+        self._data = None
+        self._files = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._hash_lock = threading.Lock()
+
+    def _modelsDir(self):
+        return self.models_dir() if callable(self.models_dir) else self.models_dir
+
+    def _readCache(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if data.get('version') == MANIFEST_VERSION else None
+
+    def _writeCache(self, data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _build(self, models_dir, scanned, previous):
+        """生成清单，大小和修改时间未变化的文件沿用 previous 中的哈希，其余文件的哈希为 None，见 fileHashes"""
+        old_models = previous.get('models', {}) if previous and previous.get('models_dir') == models_dir else {}
+        models = {}
+        for name, files in scanned.items():
+            old_files = old_models.get(name, {}).get('files', {})
+            entries = {}
+            for file_name, (size, mtime_ns) in files.items():
+                old = old_files.get(file_name)
+                unchanged = old and old.get('size') == size and old.get('mtime_ns') == mtime_ns
+                sha1 = old.get('sha1') if unchanged else None
+                entries[file_name] = {'size': size, 'mtime_ns': mtime_ns, 'sha1': sha1}
+            source = modelDirRegex.match(name).group(1)
+            models[name] = {
+                'source': source,
+                'multilingual': source in MULTILINGUAL_SOURCES,
+                'bytes': sum(entry['size'] for entry in entries.values()),
+                'files': entries,
+            }
+        return {'version': MANIFEST_VERSION, 'models_dir': models_dir, 'models': models}
+
+    def refresh(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._data is not None and now - self._checked < MANIFEST_CHECK_INTERVAL:
+                return self._data
+            self._checked = now
+            models_dir = self._modelsDir()
+            scanned = scanModelFiles(models_dir)
+            key = (models_dir, scanned)
+            if not force and self._data is not None and self._files == key:
+                return self._data
+
+            previous = self._data or self._readCache()
+            data = self._build(models_dir, scanned, previous)
+            if data != previous:
+                self._writeCache(data)
+            self._data = data
+            self._files = key
+            return data
+
+    def fileHashes(self, name):
+        """
+        模型各文件的内容哈希 {文件名: sha1}，没有该模型时返回 None。
+        清单中还没有哈希的文件在这里读取并计算，结果写回清单，之后直接使用。
+        """
+        with self._hash_lock:
+            data = self.refresh()
+            model = data['models'].get(name)
+            if model is None:
+                return None
+            hashed = False
+            for file_name, entry in model['files'].items():
+                if entry['sha1'] is not None:
+                    continue
+                if self.log is not None:
+                    self.log(f"Hashing {name}/{file_name}")
+                try:
+                    entry['sha1'] = fileSha1(os.path.join(data['models_dir'], name, file_name))
+                except OSError:
+                    continue
+                hashed = True
+            if hashed:
+                with self._lock:
+                    if self._data is data:
+                        self._writeCache(data)
+            return {file_name: entry['sha1'] for file_name, entry in model['files'].items()}
+
+    def models(self):
+        """{模型名: {'source', 'multilingual', 'bytes', 'files'}}"""
+        return self.refresh()['models']
+
+    def route(self, from_lang):
+        """翻译该语言使用的模型名：优先使用专用模型，其次使用多语言模型，都没有时返回 None"""
+        models = self.models()
+        name = f'opus-mt-{from_lang}-en'
+        if name in models:
+            return name
+        for name, model in models.items():
+            if model['multilingual']:
+                return name
+        return None
+
+    def languages(self):
+        """可以翻译的语言：有专用模型的语言，安装了多语言模型时再加上 LANGUAGE_NAMES 中的所有语言"""
+        languages = []
+        multilingual = False
+        for model in self.models().values():
+            if model['multilingual']:
+                multilingual = True
+            elif model['source'] not in languages:
+                languages.append(model['source'])
+        if multilingual:
+            languages += [lang for lang in LANGUAGE_NAMES if lang not in languages and lang != 'en']
+        return languages
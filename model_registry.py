@@ -0,0 +1,169 @@
+import gc
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def modelBytes(model):
+    """统计模型参数和缓冲区占用的内存（字节）"""
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.element_size() * tensor.nelement()
+    return total
+
+
+def processRss():
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class ModelRegistry:
+    """
+    常驻模型登记表，替代无上限的模型字典。
+
+    - 总内存预算：超出时按最久未使用的顺序卸载模型，max_bytes 为 0 表示不限制；
+    - 空闲超时：超过 idle_timeout 秒未使用的模型由后台线程卸载，之后没有翻译请求也会释放内存，0 表示不启用；
+    - 单次加载：同一个 key 并发首次请求时只加载一次，其余请求等待这次加载的结果。
+    """
+
+    def __init__(self, max_bytes=0, idle_timeout=0, sizeof=None):
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.sizeof = sizeof
+        self.stats = {'loads': 0, 'hits': 0, 'evictions': 0}
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._evictor = None
+
+    def get(self, key, loader, sizeof=None):
+        """返回 key 对应的模型，未加载时调用 loader() 加载。sizeof 用于覆盖默认的内存统计方式"""
+        self.evict_idle()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['last_used'] = time.time()
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry['value']
+
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            start = time.perf_counter()
+            value = loader()
+            load_seconds = time.perf_counter() - start
+            sizeof = sizeof or self.sizeof
+            size = sizeof(value) if sizeof is not None else 0
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            now = time.time()
+            self._entries[key] = {
+                'value': value,
+                'bytes': size,
+                'loaded_at': now,
+                'last_used': now,
+                'load_seconds': load_seconds,
+            }
+            self.stats['loads'] += 1
+            del self._loading[key]
+            self._enforce_budget(keep=key)
+            self._start_evictor()
+        future.set_result(value)
+        return value
+
+    def _enforce_budget(self, keep=None):
+        if self.max_bytes <= 0:
+            return
+        for key in list(self._entries.keys()):
+            if self.resident_bytes() <= self.max_bytes:
+                break
+            if key != keep:
+                self._drop(key)
+
+    def _drop(self, key):
+        del self._entries[key]
+        self.stats['evictions'] += 1
+
+    def evict_idle(self):
+        """卸载超过空闲时间未使用的模型，返回卸载的模型数"""
+        if self.idle_timeout <= 0:
+            return 0
+        deadline = time.time() - self.idle_timeout
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if entry['last_used'] < deadline]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def _start_evictor(self):
+        """第一次加载模型后启动后台线程，按时卸载空闲的模型（调用时持有锁）"""
+        if self.idle_timeout <= 0 or self._evictor is not None:
+            return
+        self._evictor = threading.Thread(target=self._evict_loop, name='PromptTranslator-model-evictor', daemon=True)
+        self._evictor.start()
+
+    def _evict_loop(self):
+        while True:
+            # 睡眠到最早一个模型的空闲到期时间，没有模型时按一个完整的空闲时间等待
+            with self._lock:
+                if self._entries:
+                    oldest = min(entry['last_used'] for entry in self._entries.values())
+                    wait = oldest + self.idle_timeout - time.time()
+                else:
+                    wait = self.idle_timeout
+            time.sleep(max(1.0, wait))
+            if self.evict_idle() > 0:
+                gc.collect()
+
+    def unload(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self._drop(key)
+
+    def resident_bytes(self):
+        return sum(entry['bytes'] for entry in self._entries.values())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def resident(self):
+        """当前常驻的模型及其占用的内存，供运维查看翻译模型的开销"""
+        with self._lock:
+            return [
+                {
+                    'key': key,
+                    'bytes': entry['bytes'],
+                    'load_seconds': round(entry['load_seconds'], 3),
+                    'idle_seconds': round(time.time() - entry['last_used'], 1),
+                }
+                for key, entry in self._entries.items()
+            ]
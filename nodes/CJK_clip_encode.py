@@ -1,6 +1,12 @@
-from translate import Translator
-import langid
-import re
+from ..utils import (
+    removeLoraText, restoreLoraText, detectAndTranslateMany, translateSegments, postprocessTranslation,
+    installedLanguages, log, TRANSLATION_CACHE, CACHE_ENABLED,
+)
+from ..translation_cache import makeCacheKey
+from ..conditioning_cache import encodeText
+from ..language_detect import LanguageDetector
+from ..remote_translate import RemoteTranslator
+from ..metrics import trace, stage, count
 
 LANGUAGES = {
     '中文': 'zh',
@@ -9,9 +15,52 @@ LANGUAGES = {
 }
 
 
-def _print(*args):
-    print(args)
-    return
+detector = LanguageDetector(list(LANGUAGES.values()))
+REMOTE = RemoteTranslator()  # 所有节点实例共用一个客户端和连接池
+
+
+def translateRemote(texts, from_lang):
+    """
+    用在线服务翻译片段，失败、超时或熔断的片段改用本地 Marian 模型翻译（已安装该语言模型时），
+    返回值与 utils.translateSegments 相同。
+    """
+    results = [None] * len(texts)
+    keys = [None] * len(texts)
+    if CACHE_ENABLED:
+        # 在线译文按服务地址缓存，与本地模型的译文分开；相同的片段不再重复请求，节省在线服务的免费额度
+        with stage('cache_lookup'):
+            keys = [makeCacheKey(from_lang, text, f'remote:{REMOTE.url}', {'backend': 'remote'}) for text in texts]
+            cached = TRANSLATION_CACHE.get_many(keys)
+        count('cache_hits', len(cached))
+        for index, key in enumerate(keys):
+            if key in cached:
+                results[index] = cached[key]
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    if len(pending) > 0:
+        with stage('remote'):
+            translated = REMOTE.translateMany([texts[index] for index in pending], from_lang)
+    else:
+        translated = []
+    failed = []
+    new_entries = {}
+    for index, result in zip(pending, translated):
+        if result is None:
+            failed.append(index)
+            continue
+        results[index] = postprocessTranslation(result)
+        if keys[index] is not None:
+            new_entries[keys[index]] = results[index]
+    TRANSLATION_CACHE.put_many(new_entries)
+    if len(failed) < len(pending):
+        count('remote_segments', len(pending) - len(failed))
+
+    if len(failed) > 0 and from_lang in installedLanguages():
+        count('remote_fallbacks', len(failed))
+        local = translateSegments([texts[index] for index in failed], from_lang)
+        for index, result in zip(failed, local):
+            results[index] = result
+    return results
 
 
 class CJKCLIPEncode:
@@ -19,7 +68,7 @@ class CJKCLIPEncode:
     用于 CLIP 的中英文编码节点。
 
     该节点接收一个 CLIP 模型作为输入，并包含一个文本区域，用于输入中文或英文文本。
-    如果输入的是中文，将使用 `translate` 库将其翻译成英文，并将翻译结果打印到控制台。
+    如果输入的是中文，将使用在线翻译服务逐段翻译成英文，服务超时或不可用时改用本地模型，并将翻译结果打印到控制台。
     此节点使用 ComfyUI 的 CLIP 文本编码方式对文本进行编码，输出 CONDITIONING 类型数据，以便于与 KSampler 等节点连接。
     """
 
@@ -36,111 +85,53 @@ class CJKCLIPEncode:
                 ),
                 "remove_lora_text": ([True, False], {"default": True}),
             },
+            "optional": {
+                "cache_conditioning": ([True, False], {"default": False}),  # 缓存相同文本的 CLIP 编码结果
+                "use_remote": ([True, False], {"default": True}),  # 使用在线翻译，失败时改用本地模型
+            }
         }
 
     # 定义节点的输出类型
-    RETURN_TYPES = ("CONDITIONING", "STRING",)  # 输出 CONDITIONING 类型数据
+    RETURN_TYPES = ("CONDITIONING", "STRING", "STRING",)  # 输出 CONDITIONING 类型数据、翻译后的文本、JSON 格式的各阶段耗时
+    RETURN_NAMES = ("CONDITIONING", "STRING", "metrics",)
     FUNCTION = "encode"  # 节点的入口函数为 "encode"
 
     CATEGORY = "PromptTranslator"  # 节点所属类别为 "AI_Boy"
 
-    def encode(self, clip, text, from_lang, remove_lora_text):
+    def encode(self, clip, text, from_lang, remove_lora_text, cache_conditioning=False, use_remote=True):
         """
         对输入文本进行翻译然后进行 CLIP 编码。
 
         参数：
             clip: CLIP 模型。
             text (str): 待编码的文本。
+            cache_conditioning (bool): 缓存 CLIP 编码结果，相同文本和 CLIP 再次编码时直接复用。
+            use_remote (bool): 使用在线翻译，关闭时只使用本地模型。
 
         返回值：
             CONDITIONING: 编码后的 CONDITIONING 数据。
+            metrics: JSON 格式的各阶段耗时和计数。
         """
-        noLoraText, matches = self.remove_lora_text(text)
-    
-        if from_lang == 'auto':
-            detected_lang = 'zh'
-            if self.is_only_english_content(noLoraText):
-                _print(f"检测到的语言: is_only_english_content")  # 打印检测结果到控制台
-                detected_lang = 'en'
-            else:
-                detected_lang = self.detect_lang(noLoraText)
-                _print(f"检测到的语言:{detected_lang}")  # 打印检测结果到控制台
-        else:
-            try:
-                detected_lang = LANGUAGES[from_lang]['key']
-                _print(f"指定的语言:{detected_lang}")  # 打印选择结果到控制台
-            except:
-                detected_lang = 'zh'
-
-        # 文本非英文需要翻译
-        if  'en' not in detected_lang:
-            # 如果非英文，则将其翻译成英文。必须指定 from_lang 参数，否则翻译无效
-            translator = Translator(to_lang="en", from_lang=detected_lang)
-            translated_text = translator.translate(noLoraText)  # 进行翻译
-            _print(f"翻译结果：{translated_text}")  # 打印翻译结果到控制台
-            # 正则替换字符串中 :空格数字 的内容 为:数字
-            translated_text = re.sub(r'\(.+(:[\s.\d]*)?:[\s.\d]*\)', lambda r: re.sub(r'\s*:\s*([.\d]*)\s*', ':\\1', r.group()), translated_text)
+        with trace('CJKCLIPEncode') as current:
+            with stage('lora_remove'):
+                noLoraText, matches = removeLoraText(text)
+            _from_lang = LANGUAGES.get(from_lang, 'auto')
+
+            # 逐段检测语言并并发翻译，在线服务不可用时自动改用本地模型
+            translated_text = detectAndTranslateMany(
+                [noLoraText], _from_lang, translator=translateRemote if use_remote else None, detector=detector
+            )[0]
+            log(f"翻译结果：{translated_text}")  # 打印翻译结果到控制台
+
             # 执行还原
-            text = self.restore_lora_text(translated_text, matches, remove_lora_text)  # 将翻译后的文本赋给 text 变量，用于后续的 CLIP 编码
-
-        # 进行 CLIP 文本编码
-        tokens = clip.tokenize(text)
-        cond, pooled = clip.encode_from_tokens(tokens, return_pooled=True)
-
-        return ([[cond, {"pooled_output": pooled}]], text,)
-    
-    @staticmethod
-    def remove_lora_text(text):
-        matches = []
-
-        # 定义替换函数
-        def replace_lora(match):
-            matches.append(match.group())
-            return f'_${len(matches)}'  # 打印原始文本到控制台
-        
-        noLoraText = re.sub(r'\<.+?\>', replace_lora, text)
-        _print(f"匹配到的lora：{matches}")  # 打印原始文本到控制台
-        return (noLoraText, matches)
-    
-    @staticmethod
-    def restore_lora_text(text, matches, remove_lora_text):
-        if len(matches) == 0:
-            return text
-
-        # 定义还原函数
-        def restore_lora(match):
-            if remove_lora_text:
-                return ''
-            else:
-                # 使用 group() 方法获取匹配的文本
-                matched_text = match.group()
-                # 获取匹配文本中的计数器值
-                index = int(matched_text[2:])
-                # 从原始配置值列表中取出对应的配置值
-                return matches[index - 1]
-        
-        new_text = re.sub(r'_\$\d+?', restore_lora, text)
-        new_text = re.sub(r'[\s,]*,\s*', ', ', new_text)
-        _print(f"还原lora后的文本：{new_text}")  # 打印还原后的文本到控制台
-        return (new_text)
-    
-    @staticmethod
-    def is_only_english_content(text):
-        """检查文本是否只包含英文字符、数字、空白字符和常见英文标点符号"""
-        pattern = re.compile(r'^[a-zA-Z\d\s.,!?\'":()-_\$\[\]\{\}\<\>\/|\\]+$')
-        return bool(pattern.match(text))
-    
-    @staticmethod
-    def detect_lang(text):
-        """根据标点符号分割字符串，然后检测语言。第一个非英文的文本语言作为认定语言"""
-        split_text = re.split(r'[.,;!?…—。，;！？、]', text)
-        _print(f"分割后的文本：{split_text}")  # 打印分割后的文本到控制台
-        for sub_text in split_text:
-            if len(sub_text) > 0:
-                detected_lang = langid.classify(sub_text)[0]
-                if detected_lang != 'en':
-                    return detected_lang
-        return 'en'
+            with stage('lora_restore'):
+                text = restoreLoraText(translated_text, matches, remove_lora_text)  # 将翻译后的文本赋给 text 变量，用于后续的 CLIP 编码
+
+            # 进行 CLIP 文本编码
+            with stage('clip_encode'):
+                cond, pooled = encodeText(clip, text, cache_conditioning)
+
+        return ([[cond, {"pooled_output": pooled}]], text, current.to_json() if current else '{}',)
 
 
 # 导出的节点及其名称
@@ -0,0 +1,104 @@
+from ..utils import removeLoraText, restoreLoraText, languageOptions, languageCode, detectAndTranslateMany, log, BATCH_SIZE
+from ..backends import BACKENDS, DEFAULT_BACKEND, GENERATION_PROFILES, DEFAULT_PROFILE
+from ..metrics import trace, stage, count
+
+
+class BatchPromptTranslate:
+    """
+    批量将提示词翻译成英文的文本节点。
+
+    输入可以是多行文本（每行一个提示词），也可以是上游节点输出的提示词列表（每个元素一个提示词，输出与输入一一对应）。
+    所有提示词中相同的片段只翻译一次，片段按长度分批交给模型，翻译结果按原顺序输出为列表。
+    """
+
+    INPUT_IS_LIST = True
+
+    @classmethod
+    def INPUT_TYPES(s):
+        # 定义节点的输入类型
+        return {
+            "required": {
+                "text": ("STRING", {"multiline": True, "default": ""}),  # 每行一个提示词
+                "from_lang": (
+                    languageOptions(),  # 模型目录中已安装的语言
+                    {"default": "auto"},
+                ),
+                "remove_lora_text": ("BOOLEAN", {"default": True}),
+                "batch_size": ("INT", {"default": BATCH_SIZE, "min": 1, "max": 512}),  # 每次 generate 最多翻译的片段数
+            },
+            "optional": {
+                "backend": (list(BACKENDS.keys()), {"default": DEFAULT_BACKEND}),  # 翻译模型的推理后端
+                "profile": (list(GENERATION_PROFILES.keys()), {"default": DEFAULT_PROFILE}),  # 生成参数配置：速度与质量的取舍
+            }
+        }
+
+    # 定义节点的输出类型
+    RETURN_TYPES = ("STRING", "STRING", "STRING",)  # 输出 翻译后的提示词列表、按行合并的文本、JSON 格式的各阶段耗时
+    RETURN_NAMES = ("prompts", "text", "metrics",)
+    OUTPUT_IS_LIST = (True, False, False,)
+    FUNCTION = "encode"  # 节点的入口函数为 "encode"
+
+    CATEGORY = "PromptTranslator"  # 节点所属类别
+
+    def encode(self, text, from_lang, remove_lora_text, batch_size, backend=None, profile=None):
+        """
+        批量翻译提示词。INPUT_IS_LIST 为 True，所有参数都是列表。
+
+        参数：
+            text (list[str]): 待翻译的文本。只有一个元素时（多行文本框）每一行作为一个提示词，忽略空行；
+                上游节点输出的列表中每个元素作为一个提示词，空元素原样输出，保证输出与输入一一对应。
+            from_lang (list[str]): 待翻译文本的源语言。
+            remove_lora_text (list[bool]): 移除待翻译文本中的rola字符串。
+            batch_size (list[int]): 每次 generate 最多翻译的片段数。
+            backend (list[str]): 翻译模型的推理后端。
+            profile (list[str]): 生成参数配置。
+
+        返回值：
+            prompts: 翻译后的提示词列表，顺序与输入一致。
+            text: 按行合并的翻译结果。
+            metrics: JSON 格式的各阶段耗时和计数。
+        """
+        from_lang = from_lang[0]
+        remove_lora_text = remove_lora_text[0]
+        batch_size = batch_size[0]
+        backend = backend[0] if backend else DEFAULT_BACKEND
+        profile = profile[0] if profile else DEFAULT_PROFILE
+
+        if len(text) == 1:
+            prompts = [line.strip() for line in text[0].splitlines() if line.strip()]
+        else:
+            prompts = list(text)
+        # 只翻译非空的提示词，空提示词留在原位
+        indexes = [index for index, prompt in enumerate(prompts) if prompt.strip()]
+        if len(indexes) == 0:
+            return (prompts, '\n'.join(prompts), '{}',)
+
+        with trace('BatchPromptTranslate') as current:
+            count('prompts', len(indexes))
+            with stage('lora_remove'):
+                removed = [removeLoraText(prompts[index]) for index in indexes]
+            _from_lang = languageCode(from_lang)
+
+            translated = detectAndTranslateMany(
+                [noLoraText for noLoraText, _ in removed], _from_lang, backend, profile, batch_size
+            )
+            log(f"翻译结果：{translated}")  # 打印翻译结果到控制台
+
+            # 执行还原
+            with stage('lora_restore'):
+                results = list(prompts)
+                for index, translated_text, (_, matches) in zip(indexes, translated, removed):
+                    results[index] = restoreLoraText(translated_text, matches, remove_lora_text)
+
+        return (results, '\n'.join(results), current.to_json() if current else '{}',)
+
+
+# 导出的节点及其名称
+# 注意：key要全局唯一
+NODE_CLASS_MAPPINGS = {
+    "batch_prompt_translate": BatchPromptTranslate,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "batch_prompt_translate": "Batch prompt translation",
+}
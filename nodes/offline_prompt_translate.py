@@ -1,10 +1,6 @@
-from ..utils import removeLoraText, restoreLoraText, detectAndTranslate, log, SPLIT_CHARS
-
-LANGUAGES = {
-    '中文': 'zh',
-    '日本語': 'ja',
-    'Русский': 'ru' 
-}
+from ..backends import BACKENDS, DEFAULT_BACKEND, GENERATION_PROFILES, DEFAULT_PROFILE
+from ..metrics import trace, stage
+from ..utils import removeLoraText, restoreLoraText, languageOptions, languageCode, detectAndTranslate, log, SPLIT_CHARS
 
 
 class OfflinePromptTranslate:
@@ -23,24 +19,26 @@ class OfflinePromptTranslate:
             "required": {
                 "text": ("STRING", {"multiline": True, "default": ""}),  # 多行文本框，默认值为空字符串
                 "from_lang": (
-                    ["auto"] + list(LANGUAGES.keys()),
+                    languageOptions(),  # 模型目录中已安装的语言
                     {"default": "auto"},
                 ),
                 "remove_lora_text": ("BOOLEAN", {"default": True}),
             },
             "optional": {
                 "prefix_text": ("STRING", {"forceInput": True, "multiline": True, "default": ""}),  # 多行文本框，默认值为空字符串
+                "backend": (list(BACKENDS.keys()), {"default": DEFAULT_BACKEND}),  # 翻译模型的推理后端
+                "profile": (list(GENERATION_PROFILES.keys()), {"default": DEFAULT_PROFILE}),  # 生成参数配置：速度与质量的取舍
             }
         }
 
     # 定义节点的输出类型
-    RETURN_TYPES = ("STRING",)  # 输出 翻译后的提示词文本
-    RETURN_NAMES = ("STRING",)
+    RETURN_TYPES = ("STRING", "STRING",)  # 输出 翻译后的提示词文本、JSON 格式的各阶段耗时
+    RETURN_NAMES = ("STRING", "metrics",)
     FUNCTION = "encode"  # 节点的入口函数为 "encode"
 
     CATEGORY = "PromptTranslator"  # 节点所属类别
 
-    def encode(self, text, from_lang, remove_lora_text, prefix_text = ''):
+    def encode(self, text, from_lang, remove_lora_text, prefix_text = '', backend=DEFAULT_BACKEND, profile=DEFAULT_PROFILE):
         """
         对输入文本进行翻译。
 
@@ -48,28 +46,32 @@ class OfflinePromptTranslate:
             text (str): 待翻译的文本。
             from_lang (str): 待翻译文本的源语言。
             remove_lora_text (bool): 移除待翻译文本中的rola字符串。
+            backend (str): 翻译模型的推理后端。
+            profile (str): 生成参数配置，fast 为贪心解码，balanced 为少量 beam，quality 为模型默认参数。
 
         返回值：
             STRING: 翻译后的 提示词文本。
+            metrics: JSON 格式的各阶段耗时和计数。
         """
         if prefix_text and prefix_text[-1] not in SPLIT_CHARS:  # 如果最后一个字符不是 splitChars 中的字符，则加上一个英文逗号"," 作为分隔符。
             prefix_text += ','
         
         text = prefix_text + text
         
-        noLoraText, matches = removeLoraText(text)
-        _from_lang = 'auto'
-        if from_lang in LANGUAGES:
-            _from_lang = LANGUAGES[from_lang]
-            
-        # 如果非英文，则将其翻译成英文。必须指定 from_lang 参数，否则翻译无效
-        translated_text = detectAndTranslate(noLoraText, _from_lang)
-        log(f"翻译结果：{translated_text}")  # 打印翻译结果到控制台
+        with trace('OfflinePromptTranslate') as current:
+            with stage('lora_remove'):
+                noLoraText, matches = removeLoraText(text)
+            _from_lang = languageCode(from_lang)
+                
+            # 如果非英文，则将其翻译成英文。必须指定 from_lang 参数，否则翻译无效
+            translated_text = detectAndTranslate(noLoraText, _from_lang, backend, profile)
+            log(f"翻译结果：{translated_text}")  # 打印翻译结果到控制台
 
-        # 执行还原
-        text = restoreLoraText(translated_text, matches, remove_lora_text)  # 将翻译后的文本赋给 text 变量
+            # 执行还原
+            with stage('lora_restore'):
+                text = restoreLoraText(translated_text, matches, remove_lora_text)  # 将翻译后的文本赋给 text 变量
 
-        return (text,)
+        return (text, current.to_json() if current else '{}',)
 
 
 # 导出的节点及其名称
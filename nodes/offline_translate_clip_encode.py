@@ -1,10 +1,7 @@
-from ..utils import removeLoraText, restoreLoraText, detectAndTranslate, log
-
-LANGUAGES = {
-    '中文': 'zh',
-    '日本語': 'ja',
-    'Русский': 'ru' 
-}
+from ..backends import BACKENDS, DEFAULT_BACKEND, GENERATION_PROFILES, DEFAULT_PROFILE
+from ..utils import removeLoraText, restoreLoraText, languageOptions, languageCode, detectAndTranslate, log
+from ..conditioning_cache import encodeText
+from ..metrics import trace, stage
 
 
 class OfflineTranslateClipEncode:
@@ -24,20 +21,26 @@ class OfflineTranslateClipEncode:
                 "clip": ("CLIP",),  # CLIP 模型
                 "text": ("STRING", {"multiline": True, "default": ""}),  # 多行文本框，默认值为空字符串
                 "from_lang": (
-                    ["auto"] + list(LANGUAGES.keys()),
+                    languageOptions(),  # 模型目录中已安装的语言
                     {"default": "auto"},
                 ),
                 "remove_lora_text": ("BOOLEAN", {"default": True}),
             },
+            "optional": {
+                "cache_conditioning": ("BOOLEAN", {"default": False}),  # 缓存相同文本的 CLIP 编码结果
+                "backend": (list(BACKENDS.keys()), {"default": DEFAULT_BACKEND}),  # 翻译模型的推理后端
+                "profile": (list(GENERATION_PROFILES.keys()), {"default": DEFAULT_PROFILE}),  # 生成参数配置：速度与质量的取舍
+            }
         }
 
     # 定义节点的输出类型
-    RETURN_TYPES = ("CONDITIONING", "STRING",)  # 输出 CONDITIONING 类型数据
+    RETURN_TYPES = ("CONDITIONING", "STRING", "STRING",)  # 输出 CONDITIONING 类型数据、翻译后的文本、JSON 格式的各阶段耗时
+    RETURN_NAMES = ("CONDITIONING", "STRING", "metrics",)
     FUNCTION = "encode"  # 节点的入口函数为 "encode"
 
     CATEGORY = "PromptTranslator"  # 节点所属类别
 
-    def encode(self, clip, text, from_lang, remove_lora_text):
+    def encode(self, clip, text, from_lang, remove_lora_text, cache_conditioning=False, backend=DEFAULT_BACKEND, profile=DEFAULT_PROFILE):
         """
         对输入文本进行翻译然后进行 CLIP 编码。
 
@@ -46,28 +49,33 @@ class OfflineTranslateClipEncode:
             text (str): 待编码的文本。
             from_lang (str): 待编码文本的源语言。
             remove_lora_text (bool): 移除待编码文本中的rola字符串。
+            cache_conditioning (bool): 缓存 CLIP 编码结果，相同文本和 CLIP 再次编码时直接复用。
+            backend (str): 翻译模型的推理后端。
+            profile (str): 生成参数配置，fast 为贪心解码，balanced 为少量 beam，quality 为模型默认参数。
 
         返回值：
             CONDITIONING: 编码后的 CONDITIONING 数据。
+            metrics: JSON 格式的各阶段耗时和计数。
         """
         
-        noLoraText, matches = removeLoraText(text)
-        _from_lang = 'auto'
-        if from_lang in LANGUAGES:
-            _from_lang = LANGUAGES[from_lang]
-            
-        # 如果非英文，则将其翻译成英文。必须指定 from_lang 参数，否则翻译无效
-        translated_text = detectAndTranslate(noLoraText, _from_lang)
-        log(f"翻译结果：{translated_text}")  # 打印翻译结果到控制台
-
-        # 执行还原
-        text = restoreLoraText(translated_text, matches, remove_lora_text)  # 将翻译后的文本赋给 text 变量，用于后续的 CLIP 编码
-
-        # 进行 CLIP 文本编码
-        tokens = clip.tokenize(text)
-        cond, pooled = clip.encode_from_tokens(tokens, return_pooled=True)
-
-        return ([[cond, {"pooled_output": pooled}]], text,)
+        with trace('OfflineTranslateClipEncode') as current:
+            with stage('lora_remove'):
+                noLoraText, matches = removeLoraText(text)
+            _from_lang = languageCode(from_lang)
+                
+            # 如果非英文，则将其翻译成英文。必须指定 from_lang 参数，否则翻译无效
+            translated_text = detectAndTranslate(noLoraText, _from_lang, backend, profile)
+            log(f"翻译结果：{translated_text}")  # 打印翻译结果到控制台
+
+            # 执行还原
+            with stage('lora_restore'):
+                text = restoreLoraText(translated_text, matches, remove_lora_text)  # 将翻译后的文本赋给 text 变量，用于后续的 CLIP 编码
+
+            # 进行 CLIP 文本编码
+            with stage('clip_encode'):
+                cond, pooled = encodeText(clip, text, cache_conditioning)
+
+        return ([[cond, {"pooled_output": pooled}]], text, current.to_json() if current else '{}',)
 
 
 # 导出的节点及其名称
@@ -0,0 +1,221 @@
+"""
+预翻译。
+
+编辑 OfflinePromptTranslate / OfflineTranslateClipEncode 节点的 text 时，前端（web/pretranslate.js）在停止输入一段时间后
+把文本发送到服务端，服务端在低优先级的后台线程中按节点相同的流程翻译，译文写入翻译缓存。提交任务时节点直接命中缓存，
+翻译不再占用任务的执行时间。
+
+接口（注册在 ComfyUI 的服务器上）：
+
+    POST /prompt_translator/pretranslate  {"text": "...", "from_lang": "auto", "backend": "torch", "profile": "fast", "node_id": 3}
+        -> 202 {"status": "queued" | "replaced" | "cached", "pending": 1}
+        -> 429 请求过于频繁或等待预翻译的文本已满
+    GET  /prompt_translator/pretranslate  -> {"enabled": true, "pending": 0, "stats": {...}}
+
+翻译与节点一样经过 utils.generateTranslations：设置了 PROMPT_TRANSLATOR_WORKERS 或本机翻译服务正在运行时在工作进程或服务中执行，
+PyTorch 线程数受 PROMPT_TRANSLATOR_WORKER_THREADS 限制，不占用 ComfyUI 进程的 CPU。否则在 ComfyUI 进程中翻译，
+后台线程调低的优先级只对 Python 线程生效，PyTorch 的计算线程仍为普通优先级、默认使用所有核心，会与同时进行的采样争抢 CPU。
+
+设置环境变量 PROMPT_TRANSLATOR_PRETRANSLATE=off 时不注册接口。
+"""
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+
+PRETRANSLATE_ENABLED = os.environ.get('PROMPT_TRANSLATOR_PRETRANSLATE', 'on').strip().lower() not in ('0', 'off', 'false', 'no')
+MAX_PENDING = 8  # 等待预翻译的最大文本数，已满时拒绝新的文本
+MAX_TEXT_LENGTH = 10000  # 预翻译的最大文本长度（字符）
+RATE_LIMIT = 2  # 每个客户端每秒平均最多的请求数
+RATE_BURST = 5  # 每个客户端允许连续发送的请求数
+RECENT_SIZE = 64  # 记录最近预翻译过的文本数，相同的文本不再重复预翻译
+BACKGROUND_NICE = 10  # 后台线程调低的 nice 值（仅 Linux）
+
+
+class RateLimiter:
+    """按客户端的令牌桶限流：每秒补充 rate 个令牌，最多积累 burst 个"""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_clients=1024):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # 客户端 -> (令牌数, 上次更新时间)
+        self._lock = threading.Lock()
+
+    def allow(self, client):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+def lowerThreadPriority(increment=BACKGROUND_NICE):
+    """
+    调低当前线程的调度优先级。Linux 的 nice 值按线程生效，其他系统上不做处理。
+    只影响当前 Python 线程，不影响 PyTorch 的计算线程，见模块说明。
+    """
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        thread_id = threading.get_native_id()
+        priority = os.getpriority(os.PRIO_PROCESS, thread_id)
+        os.setpriority(os.PRIO_PROCESS, thread_id, min(19, priority + increment))
+    except (AttributeError, OSError):
+        pass
+
+
+class Pretranslator:
+    """
+    预翻译队列，所有文本在同一个后台线程中依次翻译：
+
+    - 同一个 key（客户端和节点）还在排队的旧文本被新文本替换，只翻译最后一次编辑的内容；
+    - 排队的文本数不超过 max_pending，已满时拒绝新的文本；
+    - 最近翻译过的相同文本直接跳过。
+
+    translate 为翻译一个任务的函数，参数为 submit 的 job。后台线程在第一次提交时启动。
+    """
+
+    def __init__(self, translate, max_pending=MAX_PENDING, log=None):
+        self.translate = translate
+        self.max_pending = max_pending
+        self.log = log
+        self.stats = {'queued': 0, 'replaced': 0, 'cached': 0, 'rejected': 0, 'translated': 0, 'failed': 0}
+        self._pending = OrderedDict()  # key -> job
+        self._recent = OrderedDict()  # 最近翻译过的任务
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def submit(self, key, job):
+        """返回 'queued'、'replaced'、'cached'，队列已满时返回 None"""
+        signature = json.dumps(job, sort_keys=True, ensure_ascii=False)
+        with self._condition:
+            if signature in self._recent:
+                self.stats['cached'] += 1
+                return 'cached'
+            if key in self._pending:
+                status = 'replaced'
+            elif len(self._pending) >= self.max_pending:
+                self.stats['rejected'] += 1
+                return None
+            else:
+                status = 'queued'
+            self._pending[key] = job
+            self.stats[status] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='PromptTranslator-pretranslate', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return status
+
+    def _run(self):
+        from .utils import BACKGROUND_TASK
+
+        lowerThreadPriority()
+        # 预翻译不响应 ComfyUI 的取消，也不更新正在执行的节点的进度条
+        BACKGROUND_TASK.active = True
+        while True:
+            with self._condition:
+                while len(self._pending) == 0:
+                    self._condition.wait()
+                _, job = self._pending.popitem(last=False)
+            try:
+                self.translate(**job)
+            except Exception as e:
+                self.stats['failed'] += 1
+                if self.log is not None:
+                    self.log(f"Pretranslation failed: {e}")
+                continue
+            self.stats['translated'] += 1
+            with self._condition:
+                self._recent[json.dumps(job, sort_keys=True, ensure_ascii=False)] = True
+                while len(self._recent) > RECENT_SIZE:
+                    self._recent.popitem(last=False)
+
+
+def pretranslateText(text, from_lang, backend, profile):
+    """按节点相同的流程翻译一次，译文写入翻译缓存"""
+    from .utils import removeLoraText, languageCode, detectAndTranslate
+
+    noLoraText, _ = removeLoraText(text)
+    detectAndTranslate(noLoraText, languageCode(from_lang), backend, profile)
+
+
+def _log(msg):
+    from .utils import log
+
+    log(msg)
+
+
+PRETRANSLATOR = Pretranslator(pretranslateText, log=_log)
+RATE_LIMITER = RateLimiter()
+
+
+def parseJob(data):
+    """检查请求内容，返回 (key, job)，内容无效时抛出 ValueError"""
+    from .backends import BACKENDS, DEFAULT_BACKEND, GENERATION_PROFILES, DEFAULT_PROFILE
+
+    if not isinstance(data, dict):
+        raise ValueError('request body must be a JSON object')
+    text = data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError('text is required')
+    if len(text) > MAX_TEXT_LENGTH:
+        raise ValueError(f'text is longer than {MAX_TEXT_LENGTH} characters')
+    backend = data.get('backend') if data.get('backend') in BACKENDS else DEFAULT_BACKEND
+    profile = data.get('profile') if data.get('profile') in GENERATION_PROFILES else DEFAULT_PROFILE
+    from_lang = data.get('from_lang') if isinstance(data.get('from_lang'), str) else 'auto'
+    key = (str(data.get('client_id', '')), str(data.get('node_id', '')))
+    return key, {'text': text, 'from_lang': from_lang, 'backend': backend, 'profile': profile}
+
+
+def registerPretranslateRoute(routes=None, pretranslator=None, limiter=None):
+    """
+    注册 /prompt_translator/pretranslate。routes 默认为 ComfyUI 服务器的路由表，也可以传入 aiohttp 的 RouteTableDef。
+    不在 ComfyUI 中运行或已禁用预翻译时返回 False。
+    """
+    if not PRETRANSLATE_ENABLED:
+        return False
+    try:
+        from aiohttp import web
+    except ImportError:
+        return False
+    if routes is None:
+        try:
+            from server import PromptServer
+        except ImportError:
+            return False
+        routes = PromptServer.instance.routes
+    pretranslator = pretranslator or PRETRANSLATOR
+    limiter = limiter or RATE_LIMITER
+
+    @routes.post('/prompt_translator/pretranslate')
+    async def pretranslate_route(request):
+        if not limiter.allow(request.remote):
+            return web.json_response({'error': 'rate limited'}, status=429, headers={'Retry-After': '1'})
+        try:
+            key, job = parseJob(await request.json())
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        status = pretranslator.submit(key, job)
+        if status is None:
+            return web.json_response({'error': 'too many pending pretranslations'}, status=429, headers={'Retry-After': '1'})
+        return web.json_response({'status': status, 'pending': pretranslator.pending()}, status=202)
+
+    @routes.get('/prompt_translator/pretranslate')
+    async def pretranslate_status_route(request):
+        return web.json_response({'enabled': True, 'pending': pretranslator.pending(), 'stats': pretranslator.stats})
+
+    return True
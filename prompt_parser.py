@@ -0,0 +1,268 @@
+"""
+提示词的单遍扫描解析器。
+
+把提示词解析成语法树，只有普通文本片段需要翻译，权重、LoRA、embedding、BREAK、
+交替语法 [a|b] 等保持原样，翻译后按原结构拼回。整个过程是线性时间的，不依赖回溯正则。
+"""
+
+SPLIT_CHARS = "',;!?…—。，；！？、"
+
+# 分隔符中的全角标点替换为对应的英文标点
+PUNCTUATION_TABLE = str.maketrans({
+    '，': ',',
+    '。': '.',
+    '；': ';',
+    '！': '!',
+    '？': '?',
+    '、': ',',
+})
+
+OPEN_BRACKETS = {'(': ')', '[': ']', '{': '}'}
+CLOSE_BRACKETS = {')', ']', '}'}
+KEYWORDS = ('BREAK', 'AND')
+EMBEDDING_PREFIX = 'embedding:'
+NAME_STOP_CHARS = set(SPLIT_CHARS) | set('()[]{}<>|:') | {' ', '\t', '\r', '\n'}
+
+
+class Text:
+    """可翻译的文本片段，translation 为翻译后的文本"""
+
+    __slots__ = ('raw', 'translation')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.translation = None
+
+    def render(self):
+        if self.translation is None:
+            return self.raw
+        # 保留原文两侧的空白
+        core = self.raw.strip()
+        start = self.raw.find(core) if core else len(self.raw)
+        return self.raw[:start] + self.translation + self.raw[start + len(core):]
+
+
+class Syntax:
+    """不参与翻译的语法片段：LoRA 标签、占位符、权重、关键字、转义字符等"""
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def render(self):
+        return self.raw
+
+
+class Separator:
+    """片段之间的分隔符（含两侧空白），输出时全角标点替换为英文标点"""
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def render(self):
+        return self.raw.translate(PUNCTUATION_TABLE)
+
+
+class Group:
+    """括号分组，例如 (red hair:1.2) 或 [cat|dog]，close 为空表示括号未闭合"""
+
+    __slots__ = ('open', 'children', 'close')
+
+    def __init__(self, open_char):
+        self.open = open_char
+        self.children = []
+        self.close = ''
+
+    def render(self):
+        return renderNodes([self])
+
+
+def renderNodes(nodes):
+    """按原结构拼回文本。用显式的栈遍历分组，嵌套再深也不会超出递归深度"""
+    parts = []
+    stack = [(iter(nodes), '')]  # (子节点迭代器, 分组的右括号)
+    while stack:
+        node = next(stack[-1][0], None)
+        if node is None:
+            parts.append(stack.pop()[1])
+        elif isinstance(node, Group):
+            parts.append(node.open)
+            stack.append((iter(node.children), node.close))
+        else:
+            parts.append(node.render())
+    return ''.join(parts)
+
+
+def _isWordChar(char):
+    return char.isalnum() or char == '_'
+
+
+def parsePrompt(text):
+    """单遍扫描提示词，返回顶层节点列表"""
+    root = []
+    stack = []  # 未闭合的 Group
+    buffer = []
+    n = len(text)
+    i = 0
+
+    def current():
+        return stack[-1].children if stack else root
+
+    def flush():
+        if buffer:
+            current().append(Text(''.join(buffer)))
+            buffer.clear()
+
+    while i < n:
+        char = text[i]
+
+        # LoRA / 超网络标签 <lora:name:1.0>
+        if char == '<':
+            j = i + 1
+            while j < n and text[j] not in '<>\n':
+                j += 1
+            if j < n and text[j] == '>' and j > i + 1:
+                flush()
+                current().append(Syntax(text[i:j + 1]))
+                i = j + 1
+                continue
+            # 未闭合的 '<' 按普通字符处理。扫描过的范围内没有其他 '<'，每个字符最多扫描一次
+
+        # removeLoraText 生成的占位符 _$N
+        if char == '_' and i + 2 < n and text[i + 1] == '$' and text[i + 2].isdigit():
+            j = i + 2
+            while j < n and text[j].isdigit():
+                j += 1
+            flush()
+            current().append(Syntax(text[i:j]))
+            i = j
+            continue
+
+        # 转义字符，例如 \( \)
+        if char == '\\' and i + 1 < n:
+            flush()
+            current().append(Syntax(text[i:i + 2]))
+            i += 2
+            continue
+
+        if char in OPEN_BRACKETS:
+            flush()
+            group = Group(char)
+            current().append(group)
+            stack.append(group)
+            i += 1
+            continue
+
+        if char in CLOSE_BRACKETS:
+            flush()
+            if stack and OPEN_BRACKETS[stack[-1].open] == char:
+                stack.pop().close = char
+            else:
+                current().append(Syntax(char))
+            i += 1
+            continue
+
+        # 权重或提示词编辑的步数，例如 (word:1.2)、[a:b:0.5]
+        if char == ':' and stack:
+            j = i + 1
+            while j < n and text[j] in ' \t':
+                j += 1
+            k = j
+            while k < n and (text[k].isdigit() or text[k] == '.'):
+                k += 1
+            m = k
+            while m < n and text[m] in ' \t':
+                m += 1
+            if k > j and m < n and (text[m] in CLOSE_BRACKETS or text[m] == ':'):
+                # 去掉权重前的空白，例如 ( word : 1.2 ) → ( word:1.2)
+                while buffer and buffer[-1].isspace():
+                    buffer.pop()
+                flush()
+                current().append(Syntax(':' + text[j:k]))
+                i = m
+                continue
+            flush()
+            current().append(Syntax(':'))
+            i += 1
+            continue
+
+        if char == '|':
+            flush()
+            current().append(Syntax(char))
+            i += 1
+            continue
+
+        # 分隔符及其两侧的空白
+        if char.isspace() or char in SPLIT_CHARS:
+            j = i
+            while j < n and text[j].isspace():
+                j += 1
+            if j >= n or text[j] not in SPLIT_CHARS:
+                buffer.extend(text[i:j])
+                i = j
+                continue
+            # 分隔符前的空白从文本中移到分隔符里
+            k = len(buffer)
+            while k > 0 and buffer[k - 1].isspace():
+                k -= 1
+            leading = ''.join(buffer[k:])
+            del buffer[k:]
+            flush()
+            j += 1  # 分隔符本身
+            while j < n and text[j].isspace():
+                j += 1
+            current().append(Separator(leading + text[i:j]))
+            i = j
+            continue
+
+        if _isWordStart(text, i):
+            # embedding:name
+            if text.startswith(EMBEDDING_PREFIX, i):
+                j = i + len(EMBEDDING_PREFIX)
+                while j < n and text[j] not in NAME_STOP_CHARS:
+                    j += 1
+                flush()
+                current().append(Syntax(text[i:j]))
+                i = j
+                continue
+            # BREAK / AND 关键字
+            keyword = _keywordAt(text, i)
+            if keyword:
+                flush()
+                current().append(Syntax(keyword))
+                i += len(keyword)
+                continue
+
+        buffer.append(char)
+        i += 1
+
+    flush()
+    return root
+
+
+def _isWordStart(text, i):
+    return i == 0 or not _isWordChar(text[i - 1])
+
+
+def _keywordAt(text, i):
+    for keyword in KEYWORDS:
+        end = i + len(keyword)
+        if text.startswith(keyword, i) and (end >= len(text) or not _isWordChar(text[end])):
+            return keyword
+    return None
+
+
+def iterText(nodes):
+    """按出现顺序遍历所有文本节点，与 renderNodes 一样不使用递归"""
+    stack = [iter(nodes)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif isinstance(node, Text):
+            yield node
+        elif isinstance(node, Group):
+            stack.append(iter(node.children))
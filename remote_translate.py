@@ -0,0 +1,152 @@
+"""
+在线翻译客户端（MyMemory 接口，与原来使用的 translate 库相同）。
+
+- 复用同一个 requests.Session，保持长连接，连接池大小与并发数一致；
+- 连接和读取都有超时，整批请求有总的截止时间，超时的片段返回 None，由调用方回退到本地模型；
+- 连续失败达到阈值后熔断，冷却期内不再发送请求，之后放行一个请求试探，成功后恢复。
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+REMOTE_URL = os.environ.get('PROMPT_TRANSLATOR_REMOTE_URL') or 'https://api.mymemory.translated.net/get'
+REMOTE_EMAIL = os.environ.get('PROMPT_TRANSLATOR_REMOTE_EMAIL') or ''  # 填写邮箱后 MyMemory 每天的免费额度更高
+REMOTE_CONCURRENCY = 4  # 同时发送的请求数，也是连接池大小
+REMOTE_CONNECT_TIMEOUT = 2  # 建立连接的超时时间（秒）
+REMOTE_READ_TIMEOUT = 5  # 等待响应的超时时间（秒）
+REMOTE_DEADLINE = 8  # 一批片段总的等待时间（秒），超过后剩余片段改用本地模型
+REMOTE_FAILURE_THRESHOLD = 3  # 连续失败多少次后熔断
+REMOTE_COOLDOWN = 60  # 熔断后多久再尝试（秒）
+
+
+class RemoteError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """连续失败 threshold 次后打开，cooldown 秒后放行一个试探请求，成功则关闭，失败则重新计时"""
+
+    def __init__(self, threshold=REMOTE_FAILURE_THRESHOLD, cooldown=REMOTE_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def available(self):
+        """只判断当前是否可能放行请求，不占用试探名额"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            return not self._probing and time.monotonic() - self.opened_at >= self.cooldown
+
+
+class RemoteTranslator:
+    """可复用的在线翻译客户端，线程安全"""
+
+    def __init__(self, url=REMOTE_URL, email=REMOTE_EMAIL, concurrency=REMOTE_CONCURRENCY,
+                 timeout=(REMOTE_CONNECT_TIMEOUT, REMOTE_READ_TIMEOUT), deadline=REMOTE_DEADLINE, breaker=None):
+        self.url = url
+        self.email = email
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = {'requests': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0}
+        self._session = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # 不在连接层重试，失败由熔断器和本地模型处理，避免请求时间成倍增加
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='PromptTranslator-remote')
+            return self._session, self._executor
+
+    def translateOne(self, text, from_lang, to_lang='en'):
+        """翻译一个片段，失败时抛出异常"""
+        session, _ = self._client()
+        params = {'q': text, 'langpair': f'{from_lang}|{to_lang}'}
+        if self.email:
+            params['de'] = self.email
+        self.stats['requests'] += 1
+        response = session.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        translation = (data.get('responseData') or {}).get('translatedText')
+        if data.get('responseStatus') != 200 or not translation:
+            raise RemoteError(translation or f"status {data.get('responseStatus')}")
+        return translation
+
+    def _guarded(self, text, from_lang):
+        if not self.breaker.allow():
+            self.stats['rejected'] += 1
+            return None
+        try:
+            translation = self.translateOne(text, from_lang)
+        except Exception:
+            self.stats['failures'] += 1
+            self.breaker.failure()
+            return None
+        self.breaker.success()
+        return translation
+
+    def translateMany(self, texts, from_lang):
+        """
+        并发翻译多个片段，返回的列表与 texts 顺序一致；失败、被熔断或超过截止时间的片段为 None。
+
+        熔断打开时直接返回，不等待任何网络请求。
+        """
+        results = [None] * len(texts)
+        if len(texts) == 0 or not self.breaker.available():
+            return results
+        _, executor = self._client()
+        futures = {executor.submit(self._guarded, text, from_lang): index for index, text in enumerate(texts)}
+        done, not_done = wait(futures, timeout=self.deadline)
+        for future in done:
+            results[futures[future]] = future.result()
+        for future in not_done:
+            self.stats['timeouts'] += 1
+            future.cancel()
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._executor.shutdown(wait=False)
+                self._session = None
+                self._executor = None
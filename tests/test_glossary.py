@@ -0,0 +1,102 @@
+"""
+用户词库和 translateBatch 词库流程的测试，使用模拟的翻译函数，不加载模型。
+
+在插件目录中运行：
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import types
+import importlib
+import unittest
+
+# 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'PromptTranslator' not in sys.modules:
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != PLUGIN_DIR]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules['PromptTranslator'] = package
+os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'
+
+glossary = importlib.import_module('PromptTranslator.glossary')
+utils = importlib.import_module('PromptTranslator.utils')
+
+TERMS = {'初音未来': 'Hatsune Miku', '赛博朋克': 'cyberpunk', 'Miku': 'Hatsune Miku'}
+
+
+class StubStore:
+    def __init__(self, terms):
+        self.glossary = glossary.Glossary(terms)
+
+    def get(self, lang):
+        return self.glossary
+
+
+class GlossarySplitTest(unittest.TestCase):
+    def setUp(self):
+        self.glossary = glossary.Glossary(TERMS)
+
+    def test_split_at_terms(self):
+        self.assertEqual(self.glossary.split('女孩和初音未来在一起'), [
+            ('女孩和', None), ('初音未来', 'Hatsune Miku'), ('在一起', None),
+        ])
+
+    def test_no_terms(self):
+        self.assertEqual(self.glossary.split('女孩'), [('女孩', None)])
+        self.assertEqual(glossary.Glossary().split('女孩'), [('女孩', None)])
+
+    def test_whole_words_only(self):
+        self.assertEqual(self.glossary.split('Mikuru'), [('Mikuru', None)])
+        self.assertEqual(self.glossary.split('Miku 女孩'), [('Miku', 'Hatsune Miku'), (' 女孩', None)])
+
+
+class TranslateBatchGlossaryTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.originals = {'GLOSSARY': utils.GLOSSARY, 'GLOSSARY_ENABLED': utils.GLOSSARY_ENABLED}
+        utils.GLOSSARY = StubStore(TERMS)
+        utils.GLOSSARY_ENABLED = True
+
+    def tearDown(self):
+        for name, value in self.originals.items():
+            setattr(utils, name, value)
+
+    def translator(self, outputs):
+        def translate(texts, from_lang):
+            self.calls.append(list(texts))
+            return [outputs.get(text, 'en:' + text) for text in texts]
+        return translate
+
+    def test_whole_segment_hit_skips_model(self):
+        self.assertEqual(utils.translateBatch(['初音未来'], 'zh', translator=self.translator({})), ['Hatsune Miku'])
+        self.assertEqual(self.calls, [])
+
+    def test_partial_hit_sends_only_text_between_terms(self):
+        # 模型只看到词条之间的文本，即使它会丢掉或改写占位符，译文中也不会出现占位符
+        outputs = {'女孩和': 'girl with $1', '在一起': 'together _$'}
+        translated = utils.translateBatch(['女孩和初音未来在一起'], 'zh', translator=self.translator(outputs))
+        self.assertEqual(self.calls, [['女孩和', '在一起']])
+        self.assertEqual(translated, ['girl with $1 Hatsune Miku together _$'])
+
+        self.calls.clear()
+        outputs = {'女孩和': 'a girl and', '在一起': 'together'}
+        translated = utils.translateBatch(['女孩和初音未来在一起'], 'zh', translator=self.translator(outputs))
+        self.assertEqual(translated, ['a girl and Hatsune Miku together'])
+        self.assertNotIn('$', translated[0])
+
+    def test_terms_and_english_skip_model(self):
+        translated = utils.translateBatch(['初音未来 cyberpunk 赛博朋克'], 'zh', translator=self.translator({}))
+        self.assertEqual(translated, ['Hatsune Miku cyberpunk cyberpunk'])
+        self.assertEqual(self.calls, [])
+
+    def test_failed_part_keeps_original(self):
+        def translate(texts, from_lang):
+            return [None if text == '在一起' else 'a girl and' for text in texts]
+        self.assertEqual(utils.translateBatch(['女孩和初音未来在一起', '猫'], 'zh', translator=translate),
+                         ['女孩和初音未来在一起', 'a girl and'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+模型清单的测试，在临时目录中生成假的模型文件，不需要真实模型。
+
+在插件目录中运行：
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import types
+import shutil
+import tempfile
+import importlib
+import unittest
+
+# 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'PromptTranslator' not in sys.modules:
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != PLUGIN_DIR]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules['PromptTranslator'] = package
+os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'
+
+model_manifest = importlib.import_module('PromptTranslator.model_manifest')
+
+
+class ModelManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.models_dir = os.path.join(self.root, 'models')
+        for name in ('opus-mt-zh-en', 'opus-mt-mul-en'):
+            os.makedirs(os.path.join(self.models_dir, name))
+            self.write(name, 'pytorch_model.bin', b'weights-' + name.encode())
+        self.path = os.path.join(self.root, 'cache', 'model_manifest.json')
+        self.hashed = []
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, file_name, data):
+        with open(os.path.join(self.models_dir, name, file_name), 'wb') as f:
+            f.write(data)
+
+    def manifest(self):
+        return model_manifest.ModelManifest(self.models_dir, self.path, log=self.hashed.append)
+
+    def test_listing_models_does_not_hash(self):
+        manifest = self.manifest()
+        self.assertEqual(manifest.route('zh'), 'opus-mt-zh-en')
+        self.assertEqual(manifest.route('ja'), 'opus-mt-mul-en')
+        self.assertIn('ja', manifest.languages())
+        self.assertEqual(self.hashed, [])
+        self.assertIsNone(manifest.models()['opus-mt-zh-en']['files']['pytorch_model.bin']['sha1'])
+
+    def test_hashes_lazily_once(self):
+        manifest = self.manifest()
+        hashes = manifest.fileHashes('opus-mt-zh-en')
+        self.assertEqual(len(self.hashed), 1)
+        self.assertEqual(manifest.fileHashes('opus-mt-zh-en'), hashes)
+        self.assertEqual(len(self.hashed), 1)
+        self.assertIsNone(manifest.fileHashes('opus-mt-ko-en'))
+
+        # 重启后沿用清单文件中的哈希
+        restarted = self.manifest()
+        self.assertEqual(restarted.fileHashes('opus-mt-zh-en'), hashes)
+        self.assertEqual(len(self.hashed), 1)
+
+    def test_changed_file_is_hashed_again(self):
+        manifest = self.manifest()
+        hashes = manifest.fileHashes('opus-mt-zh-en')
+        self.write('opus-mt-zh-en', 'pytorch_model.bin', b'new weights')
+        manifest.refresh(force=True)
+        self.assertNotEqual(manifest.fileHashes('opus-mt-zh-en'), hashes)
+        self.assertEqual(len(self.hashed), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
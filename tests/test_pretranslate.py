@@ -0,0 +1,116 @@
+"""
+预翻译接口的测试，把路由注册到本机的 aiohttp 应用上，翻译函数为模拟函数，不加载模型。
+
+在插件目录中运行：
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import types
+import importlib
+import threading
+import unittest
+
+# 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'PromptTranslator' not in sys.modules:
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != PLUGIN_DIR]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules['PromptTranslator'] = package
+os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+pretranslate = importlib.import_module('PromptTranslator.pretranslate')
+
+URL = '/prompt_translator/pretranslate'
+
+
+class StubTranslate:
+    """记录翻译过的文本；gate 未打开时阻塞，让之后提交的文本留在队列中"""
+
+    def __init__(self):
+        self.texts = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.done = threading.Event()
+
+    def __call__(self, text, **kwargs):
+        self.texts.append(text)
+        self.started.set()
+        self.gate.wait(5)
+        if text == 'last':
+            self.done.set()
+
+
+class PretranslateRouteTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.translate = StubTranslate()
+        self.pretranslator = pretranslate.Pretranslator(self.translate, max_pending=1)
+        self.limiter = pretranslate.RateLimiter(rate=0.001, burst=3)
+        routes = web.RouteTableDef()
+        self.assertTrue(pretranslate.registerPretranslateRoute(routes, self.pretranslator, self.limiter))
+        app = web.Application()
+        app.add_routes(routes)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        self.translate.gate.set()
+        await self.client.close()
+
+    async def post(self, **body):
+        response = await self.client.post(URL, json=body)
+        return response.status, await response.json()
+
+    async def test_accepted(self):
+        status, body = await self.post(text='红色头发的猫', node_id=1)
+        self.assertEqual(status, 202)
+        self.assertEqual(body['status'], 'queued')
+        self.translate.gate.set()
+        self.assertTrue(self.translate.started.wait(5))
+        self.assertEqual(self.translate.texts, ['红色头发的猫'])
+
+        response = await self.client.get(URL)
+        self.assertEqual((await response.json())['enabled'], True)
+
+    async def test_bad_body(self):
+        self.limiter.rate = 1000
+        response = await self.client.post(URL, data='not json')
+        self.assertEqual(response.status, 400)
+        for body in ([], 'text', {'text': ''}, {'text': 1}, {'text': 'x' * (pretranslate.MAX_TEXT_LENGTH + 1)}):
+            response = await self.client.post(URL, json=body)
+            self.assertEqual(response.status, 400, body)
+
+    async def test_rate_limited(self):
+        # 同一个节点的文本互相替换，不会触发队列上限，第 4 个请求超过 burst 被限流
+        statuses = [(await self.post(text=f'文本{i}', node_id=1))[0] for i in range(4)]
+        self.assertEqual(statuses, [202, 202, 202, 429])
+
+    async def test_pending_limit(self):
+        await self.post(text='first', node_id=1)
+        self.assertTrue(self.translate.started.wait(5))
+        status, _ = await self.post(text='second', node_id=2)
+        self.assertEqual(status, 202)
+        status, _ = await self.post(text='third', node_id=3)
+        self.assertEqual(status, 429)
+        self.assertEqual(self.pretranslator.stats['rejected'], 1)
+
+    async def test_superseded_job_is_replaced(self):
+        self.pretranslator.max_pending = 2
+        await self.post(text='first', node_id=1)
+        self.assertTrue(self.translate.started.wait(5))
+        self.assertEqual((await self.post(text='draft', node_id=2))[1]['status'], 'queued')
+        status, body = await self.post(text='last', node_id=2)
+        self.assertEqual((status, body['status'], body['pending']), (202, 'replaced', 1))
+
+        self.translate.gate.set()
+        self.assertTrue(self.translate.done.wait(5))
+        self.assertEqual(self.translate.texts, ['first', 'last'])
+
+
+if __name__ == '__main__':
+    unittest.main()
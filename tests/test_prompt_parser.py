@@ -0,0 +1,54 @@
+"""
+提示词解析器的测试。
+
+在插件目录中运行：
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import types
+import importlib
+import unittest
+
+# 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'PromptTranslator' not in sys.modules:
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != PLUGIN_DIR]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules['PromptTranslator'] = package
+os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'
+
+prompt_parser = importlib.import_module('PromptTranslator.prompt_parser')
+
+
+class PromptParserTest(unittest.TestCase):
+    def translate(self, text):
+        tree = prompt_parser.parsePrompt(text)
+        for node in prompt_parser.iterText(tree):
+            if node.raw.strip():
+                node.translation = 'en:' + node.raw.strip()
+        return prompt_parser.renderNodes(tree)
+
+    def test_syntax_is_kept(self):
+        self.assertEqual(self.translate('(红发:1.2), <lora:x:0.8> [猫|狗] BREAK 蓝眼'),
+                         '(en:红发:1.2), <lora:x:0.8> [en:猫|en:狗] BREAK en:蓝眼')
+
+    def test_render_without_translation_is_identity(self):
+        text = '((猫:1.1), [狗:鸟:0.5]) \\(x\\) embedding:abc (未闭合'
+        self.assertEqual(prompt_parser.renderNodes(prompt_parser.parsePrompt(text)), text)
+
+    def test_deep_nesting(self):
+        depth = 5000
+        text = '(' * depth + '猫' + ')' * depth
+        self.assertEqual(self.translate(text), '(' * depth + 'en:猫' + ')' * depth)
+
+        unclosed = '(' * depth + '狗'
+        self.assertEqual(self.translate(unclosed), '(' * depth + 'en:狗')
+        group = prompt_parser.parsePrompt(unclosed)[0]
+        self.assertEqual(group.render(), unclosed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+在线翻译客户端和 CJKCLIPEncode 在线翻译流程的测试，使用本机的模拟 MyMemory 服务，不访问网络。
+
+在插件目录中运行：
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import tempfile
+import importlib
+import threading
+import unittest
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'PromptTranslator' not in sys.modules:
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != PLUGIN_DIR]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules['PromptTranslator'] = package
+os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'
+
+remote_translate = importlib.import_module('PromptTranslator.remote_translate')
+
+
+class StubMyMemory:
+    """模拟 MyMemory 接口：mode 为 ok 时返回 en:<原文>，503 时返回 HTTP 503，slow 时延迟 delay 秒后返回"""
+
+    def __init__(self):
+        self.mode = 'ok'
+        self.delay = 1.0
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                if stub.mode == '503':
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if stub.mode == 'slow':
+                    time.sleep(stub.delay)
+                query = parse_qs(urlsplit(self.path).query)
+                body = json.dumps({
+                    'responseStatus': 200,
+                    'responseData': {'translatedText': 'en:' + query['q'][0]},
+                }).encode('utf-8')
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # 客户端已超时断开
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/get'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RemoteTranslatorTest(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubMyMemory()
+        self.breaker = remote_translate.CircuitBreaker(threshold=2, cooldown=0.3)
+        self.remote = remote_translate.RemoteTranslator(
+            self.stub.url, concurrency=2, timeout=(1, 0.3), deadline=3, breaker=self.breaker
+        )
+
+    def tearDown(self):
+        self.remote.close()
+        self.stub.close()
+
+    def test_success(self):
+        self.assertEqual(self.remote.translateMany(['猫', '狗'], 'zh'), ['en:猫', 'en:狗'])
+        self.assertEqual(self.remote.stats['failures'], 0)
+
+    def test_http_503(self):
+        self.stub.mode = '503'
+        self.assertEqual(self.remote.translateMany(['猫'], 'zh'), [None])
+        self.assertEqual(self.remote.stats['failures'], 1)
+
+    def test_slow_response_times_out(self):
+        self.stub.mode = 'slow'
+        start = time.monotonic()
+        self.assertEqual(self.remote.translateMany(['猫'], 'zh'), [None])
+        self.assertLess(time.monotonic() - start, self.stub.delay)
+        self.assertEqual(self.remote.stats['failures'], 1)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        self.stub.mode = '503'
+        self.remote.translateMany(['猫'], 'zh')
+        self.remote.translateMany(['狗'], 'zh')
+        self.assertIsNotNone(self.breaker.opened_at)
+
+        # 熔断期间不发送请求
+        requests = self.stub.requests
+        self.assertEqual(self.remote.translateMany(['鱼'], 'zh'), [None])
+        self.assertEqual(self.stub.requests, requests)
+
+        # 冷却后放行一个试探请求，成功后恢复
+        time.sleep(0.35)
+        self.stub.mode = 'ok'
+        self.assertEqual(self.remote.translateMany(['鱼'], 'zh'), ['en:鱼'])
+        self.assertIsNone(self.breaker.opened_at)
+        self.assertEqual(self.remote.translateMany(['鸟'], 'zh'), ['en:鸟'])
+
+    def test_half_open_probe_failure_reopens(self):
+        self.stub.mode = '503'
+        self.remote.translateMany(['猫'], 'zh')
+        self.remote.translateMany(['狗'], 'zh')
+        time.sleep(0.35)
+        self.assertEqual(self.remote.translateMany(['鱼'], 'zh'), [None])
+        self.assertFalse(self.breaker.available())
+
+
+class CJKTranslateRemoteTest(unittest.TestCase):
+    """CJKCLIPEncode 的 translateRemote：在线翻译、缓存和本地模型回退"""
+
+    def setUp(self):
+        self.node = importlib.import_module('PromptTranslator.nodes.CJK_clip_encode')
+        translation_cache = importlib.import_module('PromptTranslator.translation_cache')
+        self.stub = StubMyMemory()
+        self.cache_dir = tempfile.mkdtemp()
+        self.local_calls = []
+
+        def translateSegments(texts, from_lang, *args, **kwargs):
+            self.local_calls.append(list(texts))
+            return ['LOCAL:' + text for text in texts]
+
+        self.patches = {
+            'REMOTE': remote_translate.RemoteTranslator(
+                self.stub.url, concurrency=2, timeout=(1, 0.3), deadline=3,
+                breaker=remote_translate.CircuitBreaker(threshold=2, cooldown=60),
+            ),
+            'TRANSLATION_CACHE': translation_cache.TranslationCache(os.path.join(self.cache_dir, 'cache.sqlite3')),
+            'CACHE_ENABLED': True,
+            'translateSegments': translateSegments,
+            'installedLanguages': lambda: ['zh'],
+        }
+        self.originals = {name: getattr(self.node, name) for name in self.patches}
+        for name, value in self.patches.items():
+            setattr(self.node, name, value)
+
+    def tearDown(self):
+        self.node.REMOTE.close()
+        for name, value in self.originals.items():
+            setattr(self.node, name, value)
+        self.stub.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_remote_results_are_cached(self):
+        self.assertEqual(self.node.translateRemote(['猫', '狗'], 'zh'), ['en:猫', 'en:狗'])
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(self.node.translateRemote(['猫', '狗'], 'zh'), ['en:猫', 'en:狗'])
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(self.local_calls, [])
+
+    def test_fallback_to_local_model(self):
+        self.stub.mode = '503'
+        self.assertEqual(self.node.translateRemote(['猫'], 'zh'), ['LOCAL:猫'])
+        self.assertEqual(self.local_calls, [['猫']])
+
+    def test_timeout_falls_back_to_local_model(self):
+        self.stub.mode = 'slow'
+        self.assertEqual(self.node.translateRemote(['猫'], 'zh'), ['LOCAL:猫'])
+
+    def test_no_fallback_without_local_model(self):
+        self.stub.mode = '503'
+        self.node.installedLanguages = lambda: []
+        self.assertEqual(self.node.translateRemote(['猫'], 'zh'), [None])
+        self.assertEqual(self.local_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
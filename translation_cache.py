@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalizeSegment(text):
+    """统一全角/半角字符并合并空白，使写法略有差异的同一片段命中同一条缓存"""
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+def makeCacheKey(from_lang, text, model_id, settings=None):
+    """缓存键：源语言 + 规范化后的片段 + 模型标识 + 生成参数"""
+    settings_text = json.dumps(settings or {}, sort_keys=True, ensure_ascii=False)
+    raw = '\x1f'.join([from_lang, normalizeSegment(text), model_id or '', settings_text])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """
+    片段级翻译缓存，两级结构：
+
+    1. 进程内 LRU，容量有限，命中时不触碰磁盘；
+    2. SQLite 持久化存储，ComfyUI 重启后仍然有效，使用 WAL 模式，可被多个进程同时读写。
+
+    持久化存储按条目数和最后访问时间淘汰旧记录。
+    """
+
+    def __init__(self, db_path, memory_items=4096, disk_items=200000, max_age=30 * 24 * 3600):
+        self.db_path = db_path
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.max_age = max_age
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        self._writes_since_prune = 0
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS translations_accessed ON translations(accessed)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """批量查询，返回 {key: 译文}，只包含命中的条目"""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats['memory_hits'] += 1
+                else:
+                    missing.append(key)
+            if len(missing) == 0:
+                return found
+
+            try:
+                conn = self._connect()
+                now = time.time()
+                rows = []
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows += conn.execute(
+                        f'SELECT key, value FROM translations WHERE key IN ({",".join("?" * len(chunk))}) AND accessed > ?',
+                        chunk + [now - self.max_age],
+                    ).fetchall()
+                if rows:
+                    conn.executemany('UPDATE translations SET accessed = ? WHERE key = ?', [(now, key) for key, _ in rows])
+                    conn.commit()
+            except sqlite3.Error:
+                rows = []
+
+            for key, value in rows:
+                found[key] = value
+                self._remember(key, value)
+            self.stats['disk_hits'] += len(rows)
+            self.stats['misses'] += len(missing) - len(rows)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """批量写入 {key: 译文}"""
+        if len(items) == 0:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+            try:
+                conn = self._connect()
+                now = time.time()
+                conn.executemany(
+                    'INSERT OR REPLACE INTO translations (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                    [(key, value, now, now) for key, value in items.items()],
+                )
+                conn.commit()
+                self.stats['writes'] += len(items)
+                self._writes_since_prune += len(items)
+                if self._writes_since_prune >= 256:
+                    self.prune()
+            except sqlite3.Error:
+                pass
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def prune(self):
+        """淘汰过期条目以及超出容量的最久未访问条目"""
+        with self._lock:
+            self._writes_since_prune = 0
+            try:
+                conn = self._connect()
+                removed = conn.execute('DELETE FROM translations WHERE accessed <= ?', (time.time() - self.max_age,)).rowcount
+                count = conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+                if count > self.disk_items:
+                    removed += conn.execute(
+                        'DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY accessed LIMIT ?)',
+                        (count - self.disk_items,),
+                    ).rowcount
+                conn.commit()
+                self.stats['evictions'] += removed
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._connect()
+                conn.execute('DELETE FROM translations')
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, memory_items=len(self._memory))
@@ -0,0 +1,220 @@
+"""
+本机翻译服务。
+
+同一台机器上运行多个 ComfyUI 时，每个进程都会加载自己的翻译模型。启动本服务后，各个 ComfyUI 进程把模型翻译请求发送到这里，
+所有进程共用一份模型；服务没有运行时自动改用进程内翻译。ComfyUI 默认不连接服务，需要设置环境变量
+PROMPT_TRANSLATOR_SERVER=on（或服务地址）。翻译缓存、词库仍在各个 ComfyUI 进程中处理，只有需要模型的片段会发送过来。
+
+在插件目录中启动：
+
+    python -m translation_server --port 8799
+
+接口（HTTP，只监听 127.0.0.1）：
+
+    POST /translate  {"texts": [...], "from_lang": "zh", "backend": "torch", "profile": "fast"} -> {"result": [...]}
+    GET  /health     -> {"status": "ok", "models": [...]}
+
+短时间内（BATCH_WINDOW 秒）到达的请求按语言、后端和生成参数合并去重，一起翻译。
+"""
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import Future
+
+DEFAULT_PORT = 8799
+BATCH_WINDOW = 0.01  # 合并请求的等待时间（秒）
+MAX_BATCH_TEXTS = 256  # 一次合并的最大片段数
+
+
+class TranslationClient:
+    """
+    本机翻译服务的客户端。服务没有运行或请求失败时抛出异常，之后 retry_interval 秒内不再尝试连接，
+    调用方直接使用进程内翻译。
+    """
+
+    def __init__(self, url, timeout=120, connect_timeout=0.5, retry_interval=10):
+        self.url = url.rstrip('/')
+        parts = urlsplit(self.url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or DEFAULT_PORT
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retry_interval = retry_interval
+        self._unavailable_until = 0.0
+
+    def available(self):
+        return time.monotonic() >= self._unavailable_until
+
+    def generate(self, texts, from_lang, backend=None, profile=None, batch_size=None):
+        body = json.dumps({
+            'texts': list(texts),
+            'from_lang': from_lang,
+            'backend': backend,
+            'profile': profile,
+            'batch_size': batch_size,
+        }, ensure_ascii=False).encode('utf-8')
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+        try:
+            # 连接本机端口很快，连接失败说明服务没有运行；连接成功后按翻译耗时等待
+            connection.connect()
+            connection.sock.settimeout(self.timeout)
+            connection.request('POST', '/translate', body, {'Content-Type': 'application/json'})
+            data = json.loads(connection.getresponse().read().decode('utf-8'))
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            self._unavailable_until = time.monotonic() + self.retry_interval
+            raise ConnectionError(f'Translation server {self.url} unavailable: {e}') from e
+        finally:
+            connection.close()
+        if 'error' in data:
+            raise RuntimeError(data['error'])
+        return data['result']
+
+
+class Batcher:
+    """把短时间内到达的请求按 (语言, 后端, 生成参数) 合并，去重后调用一次 generate"""
+
+    def __init__(self, generate, window=BATCH_WINDOW, max_texts=MAX_BATCH_TEXTS):
+        self.generate = generate
+        self.window = window
+        self.max_texts = max_texts
+        self.stats = {'requests': 0, 'batches': 0, 'texts': 0}
+        self._queue = queue.Queue()
+        thread = threading.Thread(target=self._run, name='PromptTranslator-server-batcher', daemon=True)
+        thread.start()
+
+    def submit(self, request):
+        future = Future()
+        self._queue.put((request, future))
+        return future
+
+    def _collect(self):
+        jobs = [self._queue.get()]
+        total = len(jobs[0][0]['texts'])
+        deadline = time.monotonic() + self.window
+        while total < self.max_texts:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            total += len(job[0]['texts'])
+        return jobs
+
+    def _run(self):
+        while True:
+            groups = {}
+            for request, future in self._collect():
+                try:
+                    key = (request['from_lang'], request.get('backend'), request.get('profile'), request.get('batch_size'))
+                    groups.setdefault(key, []).append((request, future))
+                except Exception as e:
+                    future.set_exception(e)
+            for key, jobs in groups.items():
+                # 一个批次出错时只让该批次的请求失败，合并线程继续处理后续请求
+                try:
+                    self._translate(key, jobs)
+                except Exception as e:
+                    for _, future in jobs:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _translate(self, key, jobs):
+        from_lang, backend, profile, batch_size = key
+        texts = list(dict.fromkeys(text for request, _ in jobs for text in request['texts']))
+        self.stats['requests'] += len(jobs)
+        self.stats['batches'] += 1
+        self.stats['texts'] += len(texts)
+        translated = dict(zip(texts, self.generate(texts, from_lang, backend, profile, batch_size)))
+        for request, future in jobs:
+            future.set_result([translated[text] for text in request['texts']])
+
+
+def serve(port=DEFAULT_PORT, host='127.0.0.1'):
+    """在当前进程中加载插件并启动服务，阻塞直到进程结束"""
+    import types
+    import importlib
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    # 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != plugin_dir]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [plugin_dir]
+    sys.modules['PromptTranslator'] = package
+    os.environ['PROMPT_TRANSLATOR_SERVER'] = 'off'  # 服务自身不再连接服务
+    utils = importlib.import_module('PromptTranslator.utils')
+
+    batcher = Batcher(lambda *args: utils.generateTranslations(*args, local=True))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            utils.log(format % args)
+
+        def _reply(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/health':
+                return self._reply(404, {'error': 'not found'})
+            self._reply(200, {'status': 'ok', 'models': utils.getResidentModels(), 'batching': batcher.stats})
+
+        def do_POST(self):
+            if self.path != '/translate':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8'))
+                if not isinstance(request, dict):
+                    raise ValueError('request body must be a JSON object')
+                texts = request.get('texts')
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError('texts must be a list of strings')
+                if not isinstance(request.get('from_lang'), str) or not request['from_lang']:
+                    raise ValueError('from_lang is required')
+            except ValueError as e:
+                return self._reply(400, {'error': str(e)})
+            try:
+                result = batcher.submit(request).result()
+            except Exception as e:
+                return self._reply(200, {'error': f'{type(e).__name__}: {e}'})
+            self._reply(200, {'result': result})
+
+    utils.startWarmup()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f'[PromptTranslator] Translation server listening on http://{host}:{port}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址，默认只允许本机访问')
+    args = parser.parse_args()
+    serve(args.port, args.host)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
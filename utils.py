@@ -1,21 +1,59 @@
 import os
 import re
-import langid
-from transformers import MarianMTModel, MarianTokenizer
+import shutil
+import hashlib
+import tempfile
+import time
+import threading
+from contextlib import contextmanager
+from .translation_cache import TranslationCache, makeCacheKey
+from .model_registry import ModelRegistry, modelBytes, processRss
+from .backends import getBackend, getProfile
+from .language_detect import LanguageDetector
+from .model_manifest import ModelManifest, LANGUAGE_NAMES
+from .prompt_parser import SPLIT_CHARS, parsePrompt, renderNodes, iterText
+from .metrics import stage, count
+from .worker_pool import WorkerPool, WorkerTimeout
+from .translation_server import TranslationClient, DEFAULT_PORT
+from .glossary import Glossary, GlossaryStore
 
 DEBUG_MODE = False  # 是否在控制台打印日志信息
 
-MARIAN_LOADED = {}
+MODEL_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024  # 翻译模型常驻内存上限（字节），0 表示不限制
+MODEL_IDLE_TIMEOUT = 30 * 60  # 模型空闲多久后卸载（秒），0 表示不卸载
+# 首次加载时把模型转换为 safetensors（缓存在 cache/safetensors），之后按内存映射逐个张量加载，不再反序列化整个 pickle
+LOW_MEMORY_LOADING = True
+# 模型权重精度：float32 或 bfloat16，bfloat16 占用的内存减半，译文可能略有差异，也可以通过环境变量 PROMPT_TRANSLATOR_DTYPE 设置
+MODEL_DTYPE = os.environ.get('PROMPT_TRANSLATOR_DTYPE') or 'float32'
 
-MARIAN_LIST = [
-    "opus-mt-zh-en",
-    "opus-mt-rn-en",
-    "opus-mt-taw-en",
-    "opus-mt-az-en",
-    "opus-mt-ru-en",
-    "opus-mt-ja-en"
-]
+# 插件加载后在后台预热的模型语言，例如 ['zh', 'ja', 'ru']。也可以通过环境变量 PROMPT_TRANSLATOR_PRELOAD=zh,ja 指定
+PRELOAD_LANGUAGES = []
 
+BATCH_SIZE = 32  # 每次 generate 最多翻译的片段数，片段按长度排序后分批
+
+# 工作进程模式：模型推理在独立子进程中执行，不与 ComfyUI 争抢 CPU。
+# 通过环境变量 PROMPT_TRANSLATOR_WORKERS 指定进程数（0 表示在 ComfyUI 进程内推理），
+# PROMPT_TRANSLATOR_WORKER_THREADS 指定每个进程的 PyTorch 线程数
+WORKER_PROCESSES = int(os.environ.get('PROMPT_TRANSLATOR_WORKERS') or 0)
+WORKER_THREADS = int(os.environ.get('PROMPT_TRANSLATOR_WORKER_THREADS') or 2)
+WORKER_QUEUE_SIZE = 64  # 排队等待的请求数上限
+WORKER_TIMEOUT = 120  # 单个请求的超时时间（秒）
+
+# 本机翻译服务（在插件目录中运行 python -m translation_server）的地址。服务运行时模型翻译交给它执行，
+# 同一台机器上的多个 ComfyUI 共用一份模型；服务没有运行时在当前进程中翻译。
+# 默认不连接服务，环境变量设置为 on 时使用默认地址，也可以直接设置为服务地址
+SERVER_URL = os.environ.get('PROMPT_TRANSLATOR_SERVER', '').strip()
+if SERVER_URL.lower() in ('', '0', 'off', 'false', 'no'):
+    SERVER_URL = None
+elif SERVER_URL.lower() in ('1', 'on', 'true', 'yes'):
+    SERVER_URL = f'http://127.0.0.1:{DEFAULT_PORT}'
+
+GLOSSARY_ENABLED = True  # 是否使用 glossary 目录中的用户词库，命中的词条不经过模型翻译
+
+CACHE_ENABLED = True  # 是否缓存片段翻译结果
+CACHE_MEMORY_ITEMS = 4096  # 进程内 LRU 缓存的条目数
+CACHE_DISK_ITEMS = 200000  # 磁盘缓存的最大条目数
+CACHE_MAX_AGE = 30 * 24 * 3600  # 磁盘缓存条目的最长保留时间（秒）
 
 def log(msg):
     if DEBUG_MODE:
@@ -38,6 +76,56 @@ def getExtDir(subpath=None, mkdir=False):
     return _dir
 
 
+def getModelsDir():
+    """翻译模型所在的目录，默认为插件下的 Helsinki-NLP，可以通过环境变量 PROMPT_TRANSLATOR_MODELS_DIR 指定"""
+    return os.environ.get('PROMPT_TRANSLATOR_MODELS_DIR') or getExtDir('Helsinki-NLP')
+
+
+def getGlossaryDir():
+    """用户词库目录，默认是模型目录旁边的 glossary，可以通过环境变量 PROMPT_TRANSLATOR_GLOSSARY_DIR 指定"""
+    return os.environ.get('PROMPT_TRANSLATOR_GLOSSARY_DIR') or os.path.join(os.path.dirname(getModelsDir()), 'glossary')
+
+
+MODEL_MANIFEST = ModelManifest(getModelsDir, os.path.join(getExtDir('cache'), 'model_manifest.json'), log)
+
+
+def getModelName(from_lang):
+    """翻译该语言使用的模型（opus-mt-{语言}-en 或多语言模型），没有可用模型时返回 None"""
+    return MODEL_MANIFEST.route(from_lang)
+
+
+def getModelPath(from_lang):
+    return os.path.join(getModelsDir(), getModelName(from_lang) or f'opus-mt-{from_lang}-en')
+
+
+# 其他节点下拉框中的语言名称，例如 CJKCLIPEncode 的选项
+LANGUAGE_ALIASES = {
+    '中文': 'zh',
+    '日文': 'ja',
+    '韩文': 'ko',
+}
+
+
+def languageOptions():
+    """节点语言下拉框的选项：auto + 可以翻译的语言"""
+    return ["auto"] + [LANGUAGE_NAMES.get(lang, lang) for lang in installedLanguages()]
+
+
+def languageCode(option):
+    """把下拉框的选项（包括 CJKCLIPEncode 的中文/日文/韩文）转换为语言代码，无法识别时返回 auto"""
+    for lang, name in LANGUAGE_NAMES.items():
+        if option == name:
+            return lang
+    if option in LANGUAGE_ALIASES:
+        return LANGUAGE_ALIASES[option]
+    return option if option in installedLanguages() else 'auto'
+
+
+loraRegex = re.compile(r'<[^<>\n]+>')
+loraPlaceholderRegex = re.compile(r'_\$(\d+)')
+commaRegex = re.compile(r'\s*,[\s,]*')
+
+
 def removeLoraText(text):
     matches = []
 
@@ -46,7 +134,7 @@ def removeLoraText(text):
         matches.append(match.group())
         return f'_${len(matches)}'  # 打印原始文本到控制台
     
-    noLoraText = re.sub(r'\<.+?\>', replace_lora, text)
+    noLoraText = loraRegex.sub(replace_lora, text)
     log(f"匹配到的lora：{matches}")  # 打印原始文本到控制台
     return (noLoraText, matches)
 
@@ -59,136 +147,574 @@ def restoreLoraText(text, matches, remove_lora_text):
     def restore_lora(match):
         if remove_lora_text:
             return ''
-        else:
-            # 使用 group() 方法获取匹配的文本
-            matched_text = match.group()
-            # 获取匹配文本中的计数器值
-            index = int(matched_text[2:])
-            # 从原始配置值列表中取出对应的配置值
-            return matches[index - 1]
+        # 获取匹配文本中的计数器值
+        index = int(match.group(1))
+        if index < 1 or index > len(matches):
+            return match.group()
+        # 从原始配置值列表中取出对应的配置值
+        return matches[index - 1]
     
-    new_text = re.sub(r'_\$\d+?', restore_lora, text)
-    new_text = re.sub(r'[\s,]*,\s*', ', ', new_text)
+    new_text = loraPlaceholderRegex.sub(restore_lora, text)
+    new_text = commaRegex.sub(', ', new_text)
     log(f"还原lora后的文本：{new_text}")  # 打印还原后的文本到控制台
     return new_text
 
 
+englishContentRegex = re.compile(r'^[a-zA-Z\d\s.,!?\'":()-_\$\[\]\{\}\<\>\/|\\]+$')
+
+
 def is_only_english_content(text):
     """检查文本是否只包含英文字符、数字、空白字符和常见英文标点符号"""
-    pattern = re.compile(r'^[a-zA-Z\d\s.,!?\'":()-_\$\[\]\{\}\<\>\/|\\]+$')
-    return bool(pattern.match(text))
+    return bool(englishContentRegex.match(text))
+
+
+_LANGUAGE_DETECTOR = {'languages': None, 'detector': None}
+
+
+def installedLanguages():
+    """可以翻译的语言，见 model_manifest.ModelManifest.languages"""
+    return MODEL_MANIFEST.languages()
+
+
+def getLanguageDetector():
+    """返回限定在可翻译语言上的检测器，已安装的模型变化后重新创建"""
+    languages = installedLanguages()
+    if _LANGUAGE_DETECTOR['detector'] is None or _LANGUAGE_DETECTOR['languages'] != languages:
+        _LANGUAGE_DETECTOR['detector'] = LanguageDetector(languages)
+        _LANGUAGE_DETECTOR['languages'] = languages
+    return _LANGUAGE_DETECTOR['detector']
 
     
+# 已加载的翻译模型，按内存预算和空闲时间自动卸载
+MARIAN_LOADED = ModelRegistry(
+    max_bytes=MODEL_MEMORY_BUDGET,
+    idle_timeout=MODEL_IDLE_TIMEOUT,
+    sizeof=lambda loaded: modelBytes(loaded[0]),
+)
+
+
+MARIAN_TOKENIZERS = {}  # 模型目录 -> (模型标识, 分词器)
+MODEL_LOAD_REPORTS = {}  # 语言 -> 最近一次加载的耗时和加载前后的进程内存
+_TOKENIZER_LOCK = threading.Lock()
+
+
+def load_marian_tokenizer(from_lang):
+    """加载分词器。同一模型只加载一次，PyTorch 和 CTranslate2 后端共用，卸载模型时保留（只占几 MB）"""
+    model_path = getModelPath(from_lang)
+    fingerprint = getModelFingerprint(from_lang)
+    with _TOKENIZER_LOCK:
+        cached = MARIAN_TOKENIZERS.get(model_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        from transformers import MarianTokenizer
+
+        tokenizer = MarianTokenizer.from_pretrained(model_path)
+        MARIAN_TOKENIZERS[model_path] = (fingerprint, tokenizer)
+        return tokenizer
+
+
+@contextmanager
+def fileLock(path):
+    """跨进程的互斥文件锁，阻塞直到取得锁"""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK 重试 10 秒后仍未取得锁时抛出 OSError，继续等待
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _readFingerprint(output_dir):
+    try:
+        with open(os.path.join(output_dir, 'source_fingerprint'), encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def convertModelOnce(output_dir, fingerprint, convert):
+    """
+    一次性的模型转换，多个进程（工作进程、翻译服务、批量翻译）同时首次加载同一个模型时只转换一次。
+
+    output_dir 中已有 fingerprint 相同的转换结果时直接返回；否则取得文件锁后调用 convert(tmp_dir) 把结果写入本进程独有的
+    临时目录，完成后整体替换 output_dir。等锁期间其他进程已完成转换时直接使用其结果。
+    """
+    if _readFingerprint(output_dir) == fingerprint:
+        return output_dir
+    parent = os.path.dirname(output_dir)
+    os.makedirs(parent, exist_ok=True)
+    with fileLock(output_dir + '.lock'):
+        if _readFingerprint(output_dir) == fingerprint:
+            return output_dir
+        tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(output_dir) + '.', suffix='.tmp', dir=parent)
+        try:
+            convert(tmp_dir)
+            with open(os.path.join(tmp_dir, 'source_fingerprint'), 'w', encoding='utf-8') as f:
+                f.write(fingerprint)
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.replace(tmp_dir, output_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    return output_dir
+
+
+def getSafetensorsPath(from_lang):
+    """
+    返回 safetensors 格式的模型目录：模型目录中已有 model.safetensors 时直接使用，
+    否则首次调用时转换一次，缓存在 cache/safetensors/<模型名>-<模型标识>，源模型文件变化后使用新的目录重新转换。
+    """
+    model_path = getModelPath(from_lang)
+    if os.path.exists(os.path.join(model_path, 'model.safetensors')):
+        return model_path
+
+    fingerprint = getModelFingerprint(from_lang)
+    output_dir = os.path.join(getExtDir('cache'), 'safetensors', f'{os.path.basename(model_path)}-{fingerprint[:16]}')
+
+    def convert(tmp_dir):
+        from transformers import MarianMTModel
+
+        log(f"Converting {model_path} to safetensors")
+        model = MarianMTModel.from_pretrained(model_path, low_cpu_mem_usage=True)
+        model.save_pretrained(tmp_dir, safe_serialization=True)
+
+    return convertModelOnce(output_dir, fingerprint, convert)
+
+
 def load_marian_mt(from_lang):
-    # 读取 MARIAN_LOADED 缓存
-    if from_lang in MARIAN_LOADED:
-        log(f"Loaded model: {MARIAN_LOADED[from_lang]['model_path']}")
-        return (MARIAN_LOADED[from_lang]['model'], MARIAN_LOADED[from_lang]['tokenizer'])
-    
     # 获取模型所在的目录
-    models_directory = getExtDir('Helsinki-NLP')
-    model_path = os.path.join(models_directory, f'opus-mt-{from_lang}-en')
-    
-    #  判断model_path文件是否存在
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model not found: {model_path}")
-    
-    tokenizer = MarianTokenizer.from_pretrained(model_path)
-    model = MarianMTModel.from_pretrained(model_path)
-    
-    # 设置MARIAN_LOADED缓存，防止重复加载
-    if from_lang not in MARIAN_LOADED:
-        MARIAN_LOADED[from_lang] = {
-            'model_path': model_path,
-            'model': model,
-            'tokenizer': tokenizer
+    model_path = getModelPath(from_lang)
+
+    def load():
+        #  判断model_path文件是否存在
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model not found: {model_path}")
+
+        # transformers 导入较慢，首次加载模型时才导入
+        from transformers import MarianMTModel
+
+        log(f"===Loading model: {model_path}")
+        count('model_loads')
+        with stage('model_load'):
+            # 转换只发生一次，不计入加载耗时和内存
+            weights_path = getSafetensorsPath(from_lang) if LOW_MEMORY_LOADING else model_path
+            rss_before = processRss()
+            start = time.perf_counter()
+            tokenizer = load_marian_tokenizer(from_lang)
+            if LOW_MEMORY_LOADING:
+                model = MarianMTModel.from_pretrained(weights_path, low_cpu_mem_usage=True, torch_dtype=MODEL_DTYPE)
+            else:
+                model = MarianMTModel.from_pretrained(model_path)
+            seconds = time.perf_counter() - start
+            rss_after = processRss()
+
+        MODEL_LOAD_REPORTS[from_lang] = {
+            'format': 'safetensors' if LOW_MEMORY_LOADING else 'pytorch',
+            'dtype': MODEL_DTYPE if LOW_MEMORY_LOADING else 'float32',
+            'seconds': round(seconds, 3),
+            'rss_before_bytes': rss_before,
+            'rss_after_bytes': rss_after,
+            'model_bytes': modelBytes(model),
         }
-    
-    log(f"===Loading model: {model_path}")
+        if rss_before is not None and rss_after is not None:
+            log(f"Loaded {os.path.basename(model_path)} in {seconds:.2f}s, "
+                f"RSS {rss_before / 2 ** 20:.0f} MB -> {rss_after / 2 ** 20:.0f} MB")
+        return (model, tokenizer)
 
-    return (model, tokenizer)
+    # 同一模型并发首次请求时只加载一次，路由到多语言模型的语言共用一个模型
+    return MARIAN_LOADED.get(os.path.basename(model_path), load)
 
 
-def translate(noLoraText, from_lang):
-    try:
+def warmupModel(from_lang):
+    """加载模型并执行一次很短的翻译，使首个真实请求不再承担冷启动开销"""
+    start = time.perf_counter()
+    if WORKER_POOL is not None or (TRANSLATION_SERVER is not None and TRANSLATION_SERVER.available()):
+        # 翻译交给工作进程或本机翻译服务时由它们加载模型，当前进程不再常驻一份；服务没有运行时在当前进程中加载
+        generateTranslations(['warm up'], from_lang)
+    else:
         model, tokenizer = load_marian_mt(from_lang)
-        translated = model.generate(**tokenizer(noLoraText, return_tensors="pt", padding=True))
-        text = ""
-        for t in translated:
-            text += tokenizer.decode(t, skip_special_tokens=True) 
-
-        # 正则替换字符串中 :空格数字 的内容 为:数字
-        text = re.sub(r'\(.+(:[\s.\d]*)?:[\s.\d]*\)', lambda r: re.sub(r'\s*:\s*([.\d]*)\s*', ':\\1', r.group()), text)
-        # 去掉末尾的 ,. 字符
-        text = re.sub(r'[,.]$', '', text)
-        # 首字母小写
-        text = text[0].lower() + text[1:]
-        log(f"翻译结果：{text}")  # 打印翻译结果到控制台
-    except:
-        text = noLoraText
-    
-    return (text)
-
-
-SPLIT_CHARS = "',;!?…—。，；！？、"
-splitCharRegex = re.compile('\s*[' + SPLIT_CHARS + ']\s*')
-
-
-def detectAndTranslate(text, from_lang):
-    """根据标点符号分割字符串，然后检测语言。第一个非英文的文本语言作为认定语言"""
-    splites = re.findall(splitCharRegex, text)
-    splited_text = re.split(splitCharRegex, text)
-    log(f"找到的分割符：{splites}")  # 打印分割后的文本到控制台
-    log(f"分割后的文本：{splited_text}")  # 打印分割后的文本到控制台
-    sub_text_after_translate = []
-    isAllEnglish = True
-    for sub_text in splited_text:
-        if len(sub_text) <= 0:
-            sub_text_after_translate.append(sub_text)
-            continue
-        
-        sub_text = sub_text.strip()
-        
-        if is_only_english_content(sub_text):
-            sub_text_after_translate.append(sub_text)
-            continue
-        
-        isAllEnglish = False
-        detected_lang = langid.classify(sub_text)[0]
-        log(f"字符串:{sub_text} 检测为：{detected_lang} ")  # 打印检测结果到控制台
-        if detected_lang == from_lang:
-            new_text = translate(sub_text, detected_lang)  # 进行翻译
-            sub_text_after_translate.append(new_text)
-            continue
-        
-        if from_lang == 'auto' or detected_lang == from_lang:
-            new_text = translate(sub_text, detected_lang)  # 进行翻译
-            sub_text_after_translate.append(new_text)
-            continue
-        
-        sub_text_after_translate.append(sub_text)
-    
-    if isAllEnglish: 
-        return text
+        model.generate(**tokenizer(['warm up'], return_tensors="pt", padding=True), max_new_tokens=4)
+    log(f"Warmed up {os.path.basename(getModelPath(from_lang))} for {from_lang} in {time.perf_counter() - start:.2f}s")
+
+
+def startWarmup(languages=None):
+    """
+    在后台线程中预热模型，不阻塞 ComfyUI 启动。
+
+    预热期间到达的翻译请求会等待正在进行的加载，不会重复加载同一个模型。
+    """
+    if languages is None:
+        env = os.environ.get('PROMPT_TRANSLATOR_PRELOAD')
+        languages = [lang.strip() for lang in env.split(',') if lang.strip()] if env else PRELOAD_LANGUAGES
+    languages = [lang for lang in languages if getModelName(lang) is not None]
+    if len(languages) == 0:
+        return None
+
+    def run():
+        for lang in languages:
+            try:
+                warmupModel(lang)
+            except Exception as e:
+                log(f"Warm up failed for {lang}: {e}")
+
+    thread = threading.Thread(target=run, name='PromptTranslator-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def getResidentModels():
+    """当前常驻的翻译模型及其占用的内存"""
+    return MARIAN_LOADED.resident()
+
+
+def postprocessTranslation(text):
+    """整理模型输出的译文：去掉末尾标点、首字母小写。权重等语法不会送入模型，无需修正"""
+    # 去掉末尾的 ,. 字符
+    if text.endswith((',', '.')):
+        text = text[:-1]
+    # 首字母小写
+    text = text[0].lower() + text[1:]
+    return text
+
+
+BACKGROUND_TASK = threading.local()  # 后台线程（如预翻译）中设置 active，不响应取消、不更新进度条
+
+
+def isInterrupted():
+    """ComfyUI 中是否点击了取消，不在 ComfyUI 中运行时总是 False"""
+    if getattr(BACKGROUND_TASK, 'active', False):
+        return False
+    try:
+        import comfy.model_management
+    except ImportError:
+        return False
+    return comfy.model_management.processing_interrupted()
+
+
+def throwIfInterrupted():
+    """ComfyUI 中点击了取消时抛出 InterruptProcessingException，结束当前节点的执行"""
+    # 后台线程不能检查：检查会清除取消标记，正在执行的任务就收不到取消了
+    if getattr(BACKGROUND_TASK, 'active', False):
+        return
+    try:
+        import comfy.model_management
+    except ImportError:
+        return
+    comfy.model_management.throw_exception_if_processing_interrupted()
+
+
+def isInterruption(error):
+    """error 是否为 ComfyUI 的取消异常，取消异常需要继续抛出，不能当作翻译失败处理"""
+    try:
+        from comfy.model_management import InterruptProcessingException
+    except ImportError:
+        return False
+    return isinstance(error, InterruptProcessingException)
+
+
+class ProgressReporter:
+    """通过 ComfyUI 的进度条显示翻译进度，不在 ComfyUI 中运行时不做任何事"""
+
+    def __init__(self, total):
+        self.bar = None
+        if getattr(BACKGROUND_TASK, 'active', False):
+            return
+        try:
+            import comfy.utils
+
+            self.bar = comfy.utils.ProgressBar(total)
+        except ImportError:
+            pass
+
+    def update(self, n):
+        if self.bar is not None:
+            self.bar.update(n)
+
+
+def getModelFingerprint(from_lang):
+    """根据模型清单中各文件的内容哈希生成模型标识，无需加载模型。首次调用时计算模型文件的哈希。没有可用模型时返回 None"""
+    name = getModelName(from_lang)
+    hashes = MODEL_MANIFEST.fileHashes(name) if name is not None else None
+    if hashes is None:
+        return None
+    signature = '|'.join(f"{file_name}:{sha1}" for file_name, sha1 in sorted(hashes.items()))
+    return hashlib.sha1(signature.encode('utf-8')).hexdigest()
+
+
+TRANSLATION_CACHE = TranslationCache(
+    os.path.join(getExtDir('cache'), 'translations.sqlite3'),
+    memory_items=CACHE_MEMORY_ITEMS,
+    disk_items=CACHE_DISK_ITEMS,
+    max_age=CACHE_MAX_AGE,
+)
+
+
+WORKER_POOL = WorkerPool(WORKER_PROCESSES, WORKER_THREADS, WORKER_QUEUE_SIZE, WORKER_TIMEOUT) if WORKER_PROCESSES > 0 else None
+TRANSLATION_SERVER = TranslationClient(SERVER_URL, WORKER_TIMEOUT) if SERVER_URL is not None else None
+
+
+def generateTranslations(texts, from_lang, backend=None, profile=None, batch_size=None, local=False):
+    """
+    调用推理后端批量翻译，按长度排序后每 batch_size 条组成一个批次，长度相近的文本在同一批次。失败时抛出异常。
+
+    本机翻译服务正在运行时交给服务执行，其次在启用工作进程模式时提交给工作进程执行；local 为 True 时总是在当前进程中执行。
+    """
+    if TRANSLATION_SERVER is not None and TRANSLATION_SERVER.available() and not local:
+        try:
+            with stage('server'):
+                return TRANSLATION_SERVER.generate(texts, from_lang, backend, profile, batch_size)
+        except ConnectionError:
+            pass
+        except Exception as e:
+            log(f"翻译服务失败，改为在当前进程中翻译：{e}")
+
+    if WORKER_POOL is not None and not local:
+        try:
+            with stage('worker'):
+                return WORKER_POOL.generate(texts, from_lang, backend, profile, batch_size)
+        except WorkerTimeout:
+            raise
+        except Exception as e:
+            # 工作进程异常时退回到当前进程中翻译
+            log(f"翻译工作进程失败，改为在当前进程中翻译：{e}")
+
+    batch_size = batch_size or BATCH_SIZE
+    # 按长度排序，使同一批次内的文本长度接近，减少 padding 带来的无效计算
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+    generator = getBackend(backend)
+    decoded = []
+    for start in range(0, len(sorted_texts), batch_size):
+        decoded += generator.generate(sorted_texts[start:start + batch_size], from_lang, profile)
+
+    results = [None] * len(texts)
+    for position, index in enumerate(order):
+        results[index] = decoded[position]
+    return results
+
+
+GLOSSARY = GlossaryStore(getGlossaryDir, log)
+
+
+MISSING_MODELS = set()  # 已提示过没有模型的语言
+
+
+def translateSegments(texts, from_lang, backend=None, profile=None, batch_size=None):
+    """
+    用模型翻译多段文本，返回的译文列表与 texts 顺序一致，翻译失败的位置为 None。
+
+    先查询翻译缓存，只有未命中的文本才会加载模型并翻译，全部命中时不会加载模型。
+    """
+    if getModelName(from_lang) is None:
+        # 没有可用的模型时不再尝试加载，每种语言只提示一次
+        if from_lang not in MISSING_MODELS:
+            MISSING_MODELS.add(from_lang)
+            log(f"No model installed for {from_lang}, add opus-mt-{from_lang}-en or opus-mt-mul-en to {getModelsDir()}")
+        return [None] * len(texts)
+
+    # 不同后端（如 int8 量化）和生成参数的译文可能不同，都是缓存键的一部分
+    profile_name, profile_settings = getProfile(profile)
+    settings = {'backend': getBackend(backend).name, 'profile': profile_name, **profile_settings}
+    if settings['backend'] == 'torch' and LOW_MEMORY_LOADING and MODEL_DTYPE != 'float32':
+        settings['dtype'] = MODEL_DTYPE
+
+    results = [None] * len(texts)
+    keys = [None] * len(texts)
+    model_id = getModelFingerprint(from_lang) if CACHE_ENABLED else None
+    if model_id is not None:
+        with stage('cache_lookup'):
+            keys = [makeCacheKey(from_lang, text, model_id, settings) for text in texts]
+            cached = TRANSLATION_CACHE.get_many(keys)
+        count('cache_hits', len(cached))
+        for index, key in enumerate(keys):
+            if key in cached:
+                results[index] = cached[key]
+
+    # 相同的文本只翻译一次
+    missing = {}
+    for index, key in enumerate(keys):
+        if model_id is None or key not in cached:
+            missing.setdefault(texts[index], []).append(index)
+    if len(missing) == 0:
+        return results
+
+    # 按长度排序后分块翻译：每块翻译完立即写入缓存并更新进度，块之间检查 ComfyUI 的取消操作
+    missing_texts = sorted(missing.keys(), key=len)
+    count('segments_translated', len(missing_texts))
+    chunk_size = batch_size or BATCH_SIZE
+    progress = ProgressReporter(len(missing_texts)) if len(missing_texts) > chunk_size else None
+    for start in range(0, len(missing_texts), chunk_size):
+        throwIfInterrupted()
+        chunk = missing_texts[start:start + chunk_size]
+        try:
+            decoded = generateTranslations(chunk, from_lang, backend, profile, batch_size)
+        except Exception as e:
+            if isInterruption(e):
+                raise
+            log(f"翻译失败：{e}")
+            return results
+
+        new_entries = {}
+        for text, new_text in zip(chunk, decoded):
+            try:
+                new_text = postprocessTranslation(new_text)
+            except Exception:
+                continue
+            log(f"翻译结果：{new_text}")  # 打印翻译结果到控制台
+            for index in missing[text]:
+                results[index] = new_text
+                if model_id is not None:
+                    new_entries[keys[index]] = new_text
+        TRANSLATION_CACHE.put_many(new_entries)
+        if progress is not None:
+            progress.update(len(chunk))
+    return results
+
+
+def translateBatch(texts, from_lang, backend=None, profile=None, batch_size=None, translator=None):
+    """
+    将同一语言的多段文本合并成一个批次翻译。
+
+    先查用户词库：整段命中的文本直接使用词库译文；包含词条的文本在词条处切开，只翻译词条之间的文本，
+    词条使用词库译文，不经过模型，再按原顺序拼回；其余文本见 translateSegments。
+    返回的译文列表与 texts 的顺序一一对应，翻译失败的文本（包括任一部分翻译失败）原样返回。
+    backend 为推理后端名称，见 backends.BACKENDS，默认使用 PyTorch；
+    profile 为生成参数配置名称，见 backends.GENERATION_PROFILES；batch_size 为每次生成的最大片段数。
+    translator 为 translator(texts, from_lang) 形式的函数时用它代替本地模型，返回值与 translateSegments 相同。
+    """
+    if len(texts) == 0:
+        return []
+
+    results = list(texts)
+    pieces = {}  # 需要翻译的文本切分后的各部分：{序号: [[前导空白, 文本, 尾随空白, 是否需要模型翻译], ...]}
+    segments = []  # 需要模型翻译的文本
+    glossary = GLOSSARY.get(from_lang) if GLOSSARY_ENABLED else Glossary()
+    with stage('glossary'):
+        for index, text in enumerate(texts):
+            hit = glossary.lookup(text)
+            if hit is not None:
+                results[index] = hit
+                continue
+            parts = glossary.split(text)
+            terms = sum(1 for _, target in parts if target is not None)
+            if terms == 0:
+                pieces[index] = [['', text, '', True]]
+                segments.append(text)
+                continue
+            count('glossary_terms', terms)
+            pieces[index] = []
+            for part, target in parts:
+                stripped = part.strip()
+                leading = part[:len(part) - len(part.lstrip())]
+                trailing = part[len(part.rstrip()):]
+                if target is not None:
+                    pieces[index].append([leading, target, trailing, False])
+                elif len(stripped) == 0:
+                    pieces[index].append([part, '', '', False])
+                elif is_only_english_content(stripped):
+                    pieces[index].append([leading, stripped, trailing, False])
+                else:
+                    pieces[index].append([leading, stripped, trailing, True])
+                    segments.append(stripped)
+    if len(pieces) < len(texts):
+        count('glossary_hits', len(texts) - len(pieces))
+    if len(segments) > 0:
+        if translator is not None:
+            translated = translator(segments, from_lang)
+        else:
+            translated = translateSegments(segments, from_lang, backend, profile, batch_size)
+    else:
+        translated = []
+    translated = iter(translated)
+    for index, parts in pieces.items():
+        new_text = ''
+        for leading, part, trailing, needs_model in parts:
+            if needs_model:
+                part = next(translated)
+                if part is None:
+                    new_text = None
+                    continue
+            if new_text is None:
+                continue
+            # 词条与相邻文本之间没有空白时（中文、日文等），译文之间补一个空格
+            if leading == '' and new_text and part and new_text[-1].isalnum() and part[0].isalnum():
+                new_text += ' '
+            new_text += leading + part + trailing
+        if new_text is not None:
+            results[index] = new_text
+    return results
+
+
+def translate(noLoraText, from_lang, backend=None, profile=None):
+    return translateBatch([noLoraText], from_lang, backend, profile)[0]
+
+
+def detectAndTranslateMany(texts, from_lang, backend=None, profile=None, batch_size=None, translator=None, detector=None):
+    """
+    把多个提示词解析成语法树，只翻译其中的普通文本片段，返回的译文与 texts 顺序一致。
+
+    权重、LoRA 占位符、embedding、BREAK 等语法保持原样；逐段检测语言，每个提示词的判定结果作为其片段的参考；
+    所有提示词中同一语言的片段合并后去重，按长度分批翻译，然后按原结构拼回，分隔符中的全角标点替换为英文标点。
+    detector 默认只在已安装模型的语言中检测；translator 见 translateBatch。
+    """
+    trees = []
+    pending = {}  # 待翻译文本按语言分组：{语言: [文本节点, ...]}
+    if detector is None:
+        detector = getLanguageDetector()
+    for text in texts:
+        with stage('split'):
+            tree = parsePrompt(text)
+        hint = None
+        isAllEnglish = True
+        for node in iterText(tree):
+            sub_text = node.raw.strip()
+            if len(sub_text) <= 0 or is_only_english_content(sub_text):
+                continue
+            
+            with stage('detect'):
+                if isAllEnglish:
+                    hint = detector.promptHint(text)
+                detected_lang = detector.detect(sub_text, hint)
+            isAllEnglish = False
+            log(f"字符串:{sub_text} 检测为：{detected_lang} ")  # 打印检测结果到控制台
+            if from_lang == 'auto' or detected_lang == from_lang:
+                pending.setdefault(detected_lang, []).append(node)
+        # 全是英文的提示词原样返回
+        trees.append(None if isAllEnglish else tree)
     
-    new_text = ''
-    for index, sub_text in enumerate(sub_text_after_translate):
-        new_text += sub_text
-        new_split_text = splites[index] if index < len(splites) else ''
-        # 如果new_split_text包含，或。换成,或.
-        if '，' in new_split_text:
-            new_split_text = new_split_text.replace('，', ',')
-        if '。' in new_split_text:
-            new_split_text = new_split_text.replace('。', '.')
-        if '；' in new_split_text:
-            new_split_text = new_split_text.replace('；', ';')
-        if '！' in new_split_text:
-            new_split_text = new_split_text.replace('！', '!')
-        if '？' in new_split_text:
-            new_split_text = new_split_text.replace('？', '?')
-        if '、' in new_split_text:
-            new_split_text = new_split_text.replace('、', ',')
-        new_text += new_split_text
+    # 每种语言只调用一次批量翻译，结果写回对应的文本节点
+    for detected_lang, nodes in pending.items():
+        translated = translateBatch(
+            [node.raw.strip() for node in nodes], detected_lang, backend, profile, batch_size, translator
+        )
+        for node, new_text in zip(nodes, translated):
+            node.translation = new_text
     
-    log(f"翻译后的文本:{new_text}")  # 打印检测结果到控制台
-    return new_text
+    results = []
+    with stage('render'):
+        for text, tree in zip(texts, trees):
+            results.append(text if tree is None else renderNodes(tree))
+    log(f"翻译后的文本:{results}")  # 打印检测结果到控制台
+    return results
+
+
+def detectAndTranslate(text, from_lang, backend=None, profile=None):
+    """翻译单个提示词，见 detectAndTranslateMany"""
+    return detectAndTranslateMany([text], from_lang, backend, profile)[0]
@@ -0,0 +1,82 @@
+// 编辑离线翻译节点的提示词时，停止输入一段时间后把文本发送到服务端预翻译，提交任务时译文已在翻译缓存中
+import { app } from "../../scripts/app.js";
+import { api } from "../../scripts/api.js";
+
+const NODE_TYPES = ["offline_prompt_translate", "offline_translate_clip_encode"];
+const DEBOUNCE_MS = 800; // 停止输入多久后发送（毫秒）
+const ROUTE = "/prompt_translator/pretranslate";
+
+let disabled = false; // 服务端没有注册接口时不再发送
+
+function widgetValue(node, name) {
+    return node.widgets?.find((widget) => widget.name === name)?.value;
+}
+
+function schedulePretranslate(node) {
+    if (disabled) {
+        return;
+    }
+    clearTimeout(node.__pretranslateTimer);
+    node.__pretranslateTimer = setTimeout(() => sendPretranslate(node), DEBOUNCE_MS);
+}
+
+async function sendPretranslate(node) {
+    const body = {
+        text: widgetValue(node, "text"),
+        from_lang: widgetValue(node, "from_lang"),
+        backend: widgetValue(node, "backend"),
+        profile: widgetValue(node, "profile"),
+        node_id: node.id,
+        client_id: api.clientId,
+    };
+    if (!body.text || !body.text.trim()) {
+        return;
+    }
+    const signature = JSON.stringify(body);
+    if (signature === node.__pretranslateSent) {
+        return;
+    }
+    try {
+        const response = await api.fetchApi(ROUTE, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: signature,
+        });
+        if (response.status === 404) {
+            disabled = true;
+        } else if (response.status === 429) {
+            // 服务端繁忙，稍后重试最后一次编辑的内容
+            schedulePretranslate(node);
+        } else if (response.ok) {
+            node.__pretranslateSent = signature;
+        }
+    } catch (error) {
+        // 预翻译只是优化，失败时由节点执行时翻译
+    }
+}
+
+app.registerExtension({
+    name: "PromptTranslator.Pretranslate",
+    async beforeRegisterNodeDef(nodeType, nodeData) {
+        if (!NODE_TYPES.includes(nodeData.name)) {
+            return;
+        }
+        const onNodeCreated = nodeType.prototype.onNodeCreated;
+        nodeType.prototype.onNodeCreated = function () {
+            const result = onNodeCreated?.apply(this, arguments);
+            for (const widget of this.widgets ?? []) {
+                if (!["text", "from_lang", "backend", "profile"].includes(widget.name)) {
+                    continue;
+                }
+                const callback = widget.callback;
+                widget.callback = (...args) => {
+                    schedulePretranslate(this);
+                    return callback?.apply(widget, args);
+                };
+                // 多行文本框输入时不一定触发 callback，直接监听输入事件
+                widget.inputEl?.addEventListener("input", () => schedulePretranslate(this));
+            }
+            return result;
+        };
+    },
+});
@@ -0,0 +1,253 @@
+"""
+翻译工作进程池。
+
+模型推理放在独立的子进程中执行，每个子进程限定 PyTorch 线程数，避免与 ComfyUI 中的扩散模型争抢 CPU。
+子进程通过标准输入输出按行交换 JSON：
+
+    请求：{"id": 1, "texts": [...], "from_lang": "zh", "backend": "torch", "profile": "fast", "batch_size": 32}
+    响应：{"id": 1, "result": [...]} 或 {"id": 1, "error": "..."}
+
+本文件既是插件中的模块（WorkerPool），也是子进程的入口（python worker_pool.py）。
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class WorkerTimeout(TimeoutError):
+    pass
+
+
+class _Worker:
+    """一个工作子进程，以及把它的标准输出逐行放入队列的读取线程"""
+
+    def __init__(self, threads):
+        env = dict(os.environ)
+        env['OMP_NUM_THREADS'] = str(threads)
+        env['MKL_NUM_THREADS'] = str(threads)
+        env['PROMPT_TRANSLATOR_WORKERS'] = '0'  # 子进程自己不再启动工作进程
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--threads', str(threads)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        self.responses = queue.Queue()
+        reader = threading.Thread(target=self._read, name='PromptTranslator-worker-reader', daemon=True)
+        reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)  # 子进程已退出
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+
+
+class WorkerPool:
+    """
+    翻译工作进程池：
+
+    - processes 个子进程，每个子进程使用 threads 个 PyTorch 线程；
+    - 排队的请求数不超过 queue_size，队列满或等待超过 timeout 秒时抛出 WorkerTimeout，超时的子进程会被重启以释放 CPU；
+    - 参数完全相同的并发请求合并为一次，所有调用方共享同一个结果；
+    - 等待超时的调用方放弃请求，没有其他调用方等待时，还在排队的请求被取消，不再交给子进程执行。
+
+    子进程在第一次提交请求时启动。
+    """
+
+    def __init__(self, processes=1, threads=2, queue_size=64, timeout=120):
+        self.processes = processes
+        self.threads = threads
+        self.timeout = timeout
+        self.stats = {'requests': 0, 'coalesced': 0, 'timeouts': 0, 'restarts': 0, 'cancelled': 0}
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._inflight = {}  # 请求 -> Future，Future.waiters 为等待结果的调用方数
+        self._lock = threading.Lock()
+        self._started = False
+        self._workers = []
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for index in range(self.processes):
+            thread = threading.Thread(
+                target=self._dispatch, args=(index,), name=f'PromptTranslator-worker-{index}', daemon=True
+            )
+            thread.start()
+        atexit.register(self.shutdown)
+
+    def generate(self, texts, from_lang, backend=None, profile=None, batch_size=None):
+        """在子进程中翻译，返回模型输出的原始译文，与 texts 顺序一致"""
+        self._start()
+        request = {
+            'texts': list(texts),
+            'from_lang': from_lang,
+            'backend': backend,
+            'profile': profile,
+            'batch_size': batch_size,
+        }
+        key = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            self.stats['requests'] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+            else:
+                future = Future()
+                future.waiters = 0
+                try:
+                    self._jobs.put_nowait((key, request, future))
+                except queue.Full:
+                    raise WorkerTimeout('Translation worker queue is full')
+                self._inflight[key] = future
+            future.waiters += 1
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout as e:
+            self._abandon(key, future)
+            raise WorkerTimeout(f'Translation worker did not respond in {self.timeout}s') from e
+
+    def _abandon(self, key, future):
+        """调用方等待超时后放弃请求：最后一个调用方放弃时，取消还在排队的请求"""
+        with self._lock:
+            future.waiters -= 1
+            if future.waiters > 0 or not future.cancel():
+                return  # 还有其他调用方在等待，或请求已交给子进程
+            self.stats['cancelled'] += 1
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _dispatch(self, index):
+        worker = None
+        request_id = 0
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            key, request, future = job
+            if not future.set_running_or_notify_cancel():
+                continue  # 调用方已放弃，跳过
+            try:
+                if worker is None or not worker.alive():
+                    if worker is not None:
+                        self.stats['restarts'] += 1
+                    worker = _Worker(self.threads)
+                    self._workers.append(worker)
+                request_id += 1
+                worker.process.stdin.write(json.dumps(dict(request, id=request_id), ensure_ascii=False) + '\n')
+                worker.process.stdin.flush()
+                response = self._readResponse(worker, request_id)
+                if 'error' in response:
+                    raise RuntimeError(response['error'])
+                result = response.get('result')
+                if not isinstance(result, list) or len(result) != len(request['texts']):
+                    raise RuntimeError('Translation worker returned a result of the wrong length')
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+
+    def _readResponse(self, worker, request_id):
+        """读取 request_id 对应的响应，跳过不是 JSON 的行（如第三方库的输出）和其他请求的响应"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                line = worker.responses.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                # 超时：结束子进程，立即释放 CPU，下一个请求会启动新的子进程
+                self.stats['timeouts'] += 1
+                worker.kill()
+                raise WorkerTimeout(f'Translation worker did not respond in {self.timeout}s')
+            if line is None:
+                raise RuntimeError('Translation worker exited unexpectedly')
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(response, dict) and response.get('id') == request_id:
+                return response
+
+    def shutdown(self):
+        for _ in range(self.processes):
+            try:
+                self._jobs.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.kill()
+
+
+def workerMain():
+    """子进程入口：导入插件，逐行读取请求并返回翻译结果"""
+    import types
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=2)
+    args = parser.parse_args()
+
+    # 标准输出只用于返回结果，其他输出都转到标准错误。
+    # 复制文件描述符 1 专门用于返回结果，再把 1 指向标准错误，本地库直接写入 1 的输出也不会混入结果
+    sys.stdout.flush()
+    protocol = os.fdopen(os.dup(1), 'w', encoding='utf-8', buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    # 插件目录名包含 '-'，注册一个空包后按包导入，不执行 __init__.py 中的节点注册
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path = [path for path in sys.path if os.path.abspath(path or '.') != plugin_dir]
+    package = types.ModuleType('PromptTranslator')
+    package.__path__ = [plugin_dir]
+    sys.modules['PromptTranslator'] = package
+    utils = importlib.import_module('PromptTranslator.utils')
+
+    try:
+        import torch
+
+        torch.set_num_threads(args.threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+    utils.startWarmup()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            result = utils.generateTranslations(
+                request['texts'], request['from_lang'], request.get('backend'), request.get('profile'),
+                request.get('batch_size'), local=True,
+            )
+            response = {'id': request.get('id'), 'result': result}
+        except Exception as e:
+            response = {'id': request.get('id'), 'error': f'{type(e).__name__}: {e}'}
+        protocol.write(json.dumps(response, ensure_ascii=False) + '\n')
+        protocol.flush()
+
+
+if __name__ == '__main__':
+    workerMain()